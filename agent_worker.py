@@ -0,0 +1,82 @@
+import multiprocessing
+import queue
+import time
+
+
+def _serve(white_player, black_player, requests, results, wanted):
+    players = {"w": white_player, "b": black_player}
+    for player in players.values():
+        player.cancel = wanted  # the player gives up as soon as the caller wants another ticket
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        ticket, color, board, budget = request
+        if ticket != wanted.value:
+            continue  # cancelled before it started
+        # The clock starts when the request arrives, so queue latency is not charged to the player.
+        deadline = time.monotonic() + budget if budget else None
+        player = players[color]
+        player.ticket = ticket
+        move = player.get_move(board, deadline)
+        results.put((ticket, move, player.stats))
+    for player in players.values():
+        if hasattr(player, "close"):
+            player.close()
+
+
+class AgentWorker:
+    """Runs one game's two players in their own process so a long search never blocks the caller.
+
+    `request` hands over a position and returns at once; `poll` returns the move once it is ready,
+    and `stats` then holds the player's search statistics for it. The board travels through a
+    queue, so the process always searches its own copy. `cancel` abandons the pending move and
+    stops its search, so the next request is answered without waiting for it.
+    """
+
+    def __init__(self, white_player, black_player):
+        self.requests = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.ticket = 0
+        self.wanted = multiprocessing.Value("i", 0, lock=False)  # the ticket whose move is still wanted
+        self.pending = False
+        self.stats = {}
+        # Not a daemon: an MCTS player with several workers starts its own pool inside this process.
+        self.process = multiprocessing.Process(target=_serve,
+                                               args=(white_player, black_player, self.requests, self.results,
+                                                     self.wanted))
+        self.process.start()
+
+    def request(self, board, color, budget=None):
+        """Ask for `color`'s move; `budget` is the time in seconds it may think, None for no limit."""
+        self.ticket += 1
+        self.wanted.value = self.ticket
+        self.pending = True
+        self.requests.put((self.ticket, color, board, budget))
+
+    def cancel(self):
+        # The search sees the new ticket at its next time check and returns early; its answer
+        # carries the old ticket and is dropped by poll.
+        self.ticket += 1
+        self.wanted.value = self.ticket
+        self.pending = False
+
+    def poll(self):
+        """Return (True, move) once the last requested move has arrived, else (False, None)."""
+        while self.pending:
+            try:
+                ticket, move, stats = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if ticket == self.ticket:
+                self.pending = False
+                self.stats = stats
+                return True, move
+        return False, None
+
+    def close(self, timeout=1.0):
+        self.requests.put(None)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
@@ -1,95 +1,318 @@
-import copy
 import math
+import multiprocessing
+import time
+from board import ZOBRIST_BLACK_TO_MOVE
+from agents.base import Agent
+from agents.transposition import TranspositionTable, EXACT, LOWER, UPPER, encode_move
+from tablebase import LOSS, DRAW
 
-class ABPPlayer:
-    def __init__(self, color, depth=3):
-        self.color = color
+MAX_SEARCH_DEPTH = 64
+TIME_CHECK_INTERVAL = 1024
+TABLEBASE_WIN = 100000  # score of a solved win, less the plies it takes; far above any evaluation
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+# State of a root-splitting pool process: its own searcher and the bound and stop flag shared with the parent.
+_WORKER = {}
+
+
+def _init_root_worker(color, tt_megabytes, tablebase, alpha, stop, cancel):
+    _WORKER["player"] = ABPPlayer(color, tt_megabytes=tt_megabytes, tablebase=tablebase)
+    _WORKER["player"].stop_flag = stop
+    _WORKER["player"].cancel = cancel
+    _WORKER["alpha"] = alpha
+
+
+def _search_root_move(args):
+    """Score one root move to `depth` plies; returns (index, score or None if out of time, nodes)."""
+    board, index, move, depth, deadline, ticket = args
+    player = _WORKER["player"]
+    player.ticket = ticket
+    player.start_search(deadline)
+    player.tt.new_search()  # entries from earlier jobs age out like the parent's do between moves
+    if player.out_of_time():
+        return index, None, 0
+    player.nodes = 0
+    player.depth_reached = depth - 1  # let the time checks fire, the parent already has a move
+    player.killers = [[None, None] for _ in range(depth + 1)]
+    player.pv = []
+    # Moves that cannot beat the best score found so far by any worker are cut off at once.
+    alpha = _WORKER["alpha"].value
+    board.make_move(*move)
+    try:
+        score, _ = player.minimax(board, depth - 1, False, alpha, math.inf, 1)
+    except SearchTimeout:
+        score = None
+    return index, score, player.nodes
+
+
+class ABPPlayer(Agent):
+    def __init__(self, color, depth=3, time_limit=None, tt_megabytes=4, tablebase=None, workers=1,
+                 position_cache=None):
+        super().__init__(color)
+        self.position_cache = position_cache
         self.depth = depth
+        self.time_limit = time_limit  # seconds per move; None searches exactly `depth` plies
+        self.tt_megabytes = tt_megabytes
+        self.tt = TranspositionTable(tt_megabytes)
+        self.tablebase = tablebase  # positions it covers are scored exactly instead of searched
+        self.workers = workers  # >1 splits the root moves of each iteration over a process pool
+        self.pool = None
+        self.shared_alpha = None
+        self.stop_flag = None  # shared with the pool, so stop() also ends the workers' searches
+        self.nodes = 0
+        self.depth_reached = 0
+        self.cutoffs = 0  # beta cutoffs and transposition hits, counted only when instrumented
+        self.tt_hits = 0
+        self.killers = []
+        self.history = {}
+        self.pv = []
 
-    def get_move(self, board):
-        best_score, best_move = self.minimax(board, self.depth, True, -math.inf, math.inf)
-        if best_move:
-            sr, sc = best_move[0]
-            er, ec = best_move[1]
-            temp_board = copy.deepcopy(board)
-            jumped, (new_r, new_c) = temp_board.move_piece((sr, sc), (er, ec))
-            if jumped:
-                while True:
-                    more_jumps = temp_board.get_valid_moves(new_r, new_c, only_captures=True)
-                    if not more_jumps:
-                        break
-                    jump_to = self.select_best_jump(temp_board, new_r, new_c, more_jumps)
-                    temp_board.move_piece((new_r, new_c), jump_to)
-                    new_r, new_c = jump_to
-            return ((sr, sc), (er, ec))
-        return None
-
-    def minimax(self, board, depth, maximizing_player, alpha, beta):
-        winner = board.check_winner()
-        if depth == 0 or winner is not None:
-            return self.evaluate(board), None
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = state["shared_alpha"] = state["stop_flag"] = state["cancel"] = None
+        return state
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def stop(self):
+        super().stop()
+        if self.stop_flag is not None:
+            self.stop_flag.value = 1
+
+    def out_of_time(self):
+        return super().out_of_time() or (self.stop_flag is not None and self.stop_flag.value)
+
+    def get_move(self, board, deadline=None):
+        if deadline is None and self.time_limit is not None:
+            deadline = time.monotonic() + self.time_limit
+        self.start_search(deadline)
+        self.tt.new_search()
+        move = self.iterative_deepening(board)
+        return self.finish_search(move, nodes=self.nodes, depth=self.depth_reached,
+                                  cutoffs=self.cutoffs, tt_hits=self.tt_hits)
+
+    def iterative_deepening(self, board):
+        # With a deadline the search deepens until time runs out instead of stopping at `depth`.
+        timed = self.deadline is not None
+        max_depth = MAX_SEARCH_DEPTH if timed else self.depth
+        self.nodes = 0
+        self.depth_reached = 0
+        self.cutoffs = 0
+        self.tt_hits = 0
+        self.killers = [[None, None] for _ in range(max_depth + 1)]
+        self.history = {}
+        self.pv = []
+
+        root_moves = self.legal_moves(board, self.color)
+        if not root_moves:
+            return None
+        if len(root_moves) == 1:
+            return root_moves[0]
+
+        # Pool workers are daemonic and cannot start their own pool, e.g. inside tournament.py.
+        parallel = self.workers > 1 and not multiprocessing.current_process().daemon
+        if parallel:
+            self.start_pool()
+        best_move = root_moves[0]
+        for depth in range(1, max_depth + 1):
+            iteration_start = time.monotonic()
+            try:
+                if parallel and depth > 1:
+                    move = self.parallel_root(board, root_moves, depth, best_move)
+                else:
+                    _, move = self.minimax(board, depth, True, -math.inf, math.inf)
+            except SearchTimeout:
+                break
+            if move is not None:
+                best_move = move
+            self.depth_reached = depth
+            self.pv = self.principal_variation(board, depth)
+            if self.stopped:
+                break
+            if timed:
+                now = time.monotonic()
+                # The next iteration costs several times this one; skip it if it cannot finish.
+                if now >= self.deadline or now + 2 * (now - iteration_start) > self.deadline:
+                    break
+        return best_move
+
+    def start_pool(self):
+        if self.pool is None:
+            self.shared_alpha = multiprocessing.Value("i", 0, lock=False)
+            self.stop_flag = multiprocessing.Value("b", 0, lock=False)
+            self.pool = multiprocessing.Pool(self.workers, _init_root_worker,
+                                             (self.color, self.tt_megabytes, self.tablebase,
+                                              self.shared_alpha, self.stop_flag, self.cancel))
+        self.stop_flag.value = 0
+
+    def parallel_root(self, board, root_moves, depth, first):
+        """One iteration with the root moves split over the pool.
+
+        The previous best move is searched here first with a full window, as it is usually
+        best again; the others then only need to be searched above its score, and every
+        improvement a worker reports tightens the bound the remaining moves start from.
+        """
+        undo = board.make_move(*first)
+        try:
+            best_score, _ = self.minimax(board, depth - 1, False, -math.inf, math.inf, 1)
+        finally:
+            board.unmake_move(undo)
+        best_move = first
+        self.shared_alpha.value = best_score
+        jobs = [(board, i, move, depth, self.deadline, self.ticket) for i, move in enumerate(root_moves) if move != first]
+        timed_out = False
+        for index, score, nodes in self.pool.imap_unordered(_search_root_move, jobs):
+            self.nodes += nodes
+            if score is None:
+                timed_out = True
+            elif score > best_score:
+                best_score, best_move = score, root_moves[index]
+                self.shared_alpha.value = best_score
+        if timed_out:
+            raise SearchTimeout
+        self.tt.store(board.hash ^ ZOBRIST_BLACK_TO_MOVE if self.color == "b" else board.hash,
+                      depth, EXACT, best_score, best_move)
+        return best_move
+
+    def principal_variation(self, board, depth):
+        line = []
+        undo_stack = []
+        maximizing = True
+        for _ in range(depth):
+            color = self.color if maximizing else ("b" if self.color == "w" else "w")
+            key = board.hash ^ ZOBRIST_BLACK_TO_MOVE if color == "b" else board.hash
+            entry = self.tt.probe(key)
+            if entry is None or entry[3] is None:
+                break
+            move = next((m for m in self.legal_moves(board, color) if encode_move(m) == entry[3]), None)
+            if move is None:
+                break
+            line.append(move)
+            undo_stack.append(board.make_move(*move))
+            maximizing = not maximizing
+        while undo_stack:
+            board.unmake_move(undo_stack.pop())
+        return line
+
+    def order_moves(self, moves, ply, tt_move, color):
+        pv_move = self.pv[ply] if ply < len(self.pv) else None
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        history = self.history
+
+        def priority(move):
+            if tt_move is not None and encode_move(move) == tt_move:
+                return 4 << 40
+            if move == pv_move:
+                return 3 << 40
+            if move == killers[0]:
+                return 2 << 40
+            if move == killers[1]:
+                return 1 << 40
+            return history.get((color, move), 0)
+
+        moves.sort(key=priority, reverse=True)
+
+    def record_cutoff(self, move, ply, depth, color):
+        if self.instrumented:
+            self.cutoffs += 1
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[(color, move)] = self.history.get((color, move), 0) + depth * depth
+
+    def minimax(self, board, depth, maximizing_player, alpha, beta, ply=0):
+        self.nodes += 1
+        if self.depth_reached and self.nodes % TIME_CHECK_INTERVAL == 0 and self.out_of_time():
+            raise SearchTimeout
 
         color = self.color if maximizing_player else ("b" if self.color == "w" else "w")
+        key = board.hash ^ ZOBRIST_BLACK_TO_MOVE if color == "b" else board.hash
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None  # encoded (start, end) of the stored best move
+        entry = self.tt.probe(key)
+        if entry is not None:
+            if self.instrumented:
+                self.tt_hits += 1
+            tt_depth, flag, score, tt_move = entry
+            if tt_depth >= depth and ply > 0:
+                if flag == EXACT:
+                    return score, None
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score, None
+
+        if self.tablebase is not None and ply > 0:
+            known = self.tablebase.probe(board, color)
+            if known is not None:
+                result, plies = known
+                score = 0 if result == DRAW else TABLEBASE_WIN - ply - plies
+                if (result == LOSS) != (color != self.color):
+                    score = -score
+                return score, None
+
+        winner = self.winner(board)
+        if depth == 0 or winner is not None:
+            score = self.evaluate(board)
+            self.tt.store(key, depth, EXACT, score, None)
+            return score, None
+
         best_move = None
-        moves = board.get_all_moves(color)
+        moves = self.legal_moves(board, color)
+        self.order_moves(moves, ply, tt_move, color)
 
         if maximizing_player:
-            max_eval = -math.inf
+            best_eval = -math.inf
             for move in moves:
-                temp_board = copy.deepcopy(board)
-                temp_board.move_piece(*move)
-                eval_score, _ = self.minimax(temp_board, depth - 1, False, alpha, beta)
-                if eval_score > max_eval:
-                    max_eval = eval_score
+                undo = board.make_move(*move)
+                try:
+                    eval_score, _ = self.minimax(board, depth - 1, False, alpha, beta, ply + 1)
+                finally:
+                    board.unmake_move(undo)
+                if eval_score > best_eval:
+                    best_eval = eval_score
                     best_move = move
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
+                    self.record_cutoff(move, ply, depth, color)
                     break
-            return max_eval, best_move
         else:
-            min_eval = math.inf
+            best_eval = math.inf
             for move in moves:
-                temp_board = copy.deepcopy(board)
-                temp_board.move_piece(*move)
-                eval_score, _ = self.minimax(temp_board, depth - 1, True, alpha, beta)
-                if eval_score < min_eval:
-                    min_eval = eval_score
+                undo = board.make_move(*move)
+                try:
+                    eval_score, _ = self.minimax(board, depth - 1, True, alpha, beta, ply + 1)
+                finally:
+                    board.unmake_move(undo)
+                if eval_score < best_eval:
+                    best_eval = eval_score
                     best_move = move
                 beta = min(beta, eval_score)
                 if beta <= alpha:
+                    self.record_cutoff(move, ply, depth, color)
                     break
-            return min_eval, best_move
+
+        if best_move is not None:
+            if best_eval <= alpha_orig:
+                flag = UPPER
+            elif best_eval >= beta_orig:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.tt.store(key, depth, flag, best_eval, best_move)
+        return best_eval, best_move
 
     def evaluate(self, board):
-        score = 0
-        for row in board.board:
-            for piece in row:
-                if piece != 0:
-                    base_score = 5 if piece.isupper() else 1
-                    if piece.lower() == self.color:
-                        score += base_score
-                    else:
-                        score -= base_score
-        return score
-
-    def select_best_jump(self, board, r, c, jump_options):
-        max_captures = -1
-        best_jump = jump_options[0]
-        for jump in jump_options:
-            temp = copy.deepcopy(board)
-            temp.move_piece((r, c), jump)
-            count = self.count_additional_jumps(temp, jump[0], jump[1])
-            if count > max_captures:
-                max_captures = count
-                best_jump = jump
-        return best_jump
-
-    def count_additional_jumps(self, board, r, c):
-        total = 0
-        while True:
-            next_jumps = board.get_valid_moves(r, c, only_captures=True)
-            if not next_jumps:
-                break
-            total += 1
-            r, c = next_jumps[0]
-        return total
\ No newline at end of file
+        # Material and piece-square terms, maintained incrementally by the board as moves are made.
+        return board.score if self.color == "w" else -board.score
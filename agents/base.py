@@ -0,0 +1,65 @@
+import time
+
+
+class Agent:
+    """Interface shared by every player.
+
+    `get_move(board, deadline=None)` returns a move, or None when there is none. `deadline` is a
+    time.monotonic() value: an agent given one answers by then with the best move found so far,
+    whatever its depth or simulation settings. `stop()` ends a running search early in the same way,
+    and so does another process moving `cancel`, a shared multiprocessing.Value, off `ticket`.
+    After each move `stats` holds what the search did: nodes, simulations, depth and elapsed seconds.
+    Setting `instrumented` adds the agent's detailed counters (cutoffs, tree size, rollout lengths...),
+    which are not collected otherwise. With a `position_cache`, legal moves and game results come
+    from that PositionCache, which several agents may share.
+    """
+
+    def __init__(self, color):
+        self.color = color
+        self.deadline = None
+        self.stopped = False
+        self.cancel = None  # the ticket the caller still wants a move for, shared by AgentWorker
+        self.ticket = 0  # the ticket of the running search
+        self.search_start = 0.0
+        self.stats = {}
+        self.instrumented = False
+        self.position_cache = None
+        self.cache_counts = (0, 0)
+
+    def get_move(self, board, deadline=None):
+        raise NotImplementedError
+
+    def stop(self):
+        self.stopped = True
+
+    def start_search(self, deadline):
+        self.deadline = deadline
+        self.stopped = False
+        self.search_start = time.monotonic()
+        if self.position_cache is not None:
+            self.cache_counts = (self.position_cache.hits, self.position_cache.misses)
+
+    def out_of_time(self):
+        return (self.stopped or (self.deadline is not None and time.monotonic() >= self.deadline)
+                or (self.cancel is not None and self.cancel.value != self.ticket))
+
+    def finish_search(self, move, nodes=0, simulations=0, depth=0, **counters):
+        self.stats = {"nodes": nodes, "simulations": simulations, "depth": depth,
+                      "elapsed": time.monotonic() - self.search_start}
+        if self.instrumented:
+            self.stats.update(counters)
+            if self.position_cache is not None:
+                hits, misses = self.cache_counts
+                self.stats["cache_hits"] = self.position_cache.hits - hits
+                self.stats["cache_misses"] = self.position_cache.misses - misses
+        return move
+
+    def legal_moves(self, board, color):
+        if self.position_cache is None:
+            return board.get_all_moves(color)
+        return self.position_cache.get_all_moves(board, color)
+
+    def winner(self, board):
+        if self.position_cache is None:
+            return board.check_winner()
+        return self.position_cache.check_winner(board)
@@ -0,0 +1,235 @@
+import numpy as np
+
+# A batch of positions is an (N, 4) uint64 array of bitboards in this column order,
+# using the BitBoard square numbering (bit row * 8 + col).
+WM, BM, WK, BK = 0, 1, 2, 3
+
+U64 = np.uint64
+ONE = U64(1)
+COL0 = U64(sum(1 << (row * 8) for row in range(8)))
+NOT_COL0 = ~COL0
+NOT_COL7 = ~(COL0 << U64(7))
+
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+STEPS = np.array([-8, 8, -1, 1], dtype=np.int64)
+MAX_DISTANCE = 7
+
+
+def shift(bb, d):
+    if d == UP:
+        return bb >> U64(8)
+    if d == DOWN:
+        return bb << U64(8)
+    if d == LEFT:
+        return (bb & NOT_COL0) >> ONE
+    return (bb & NOT_COL7) << ONE
+
+
+def encode(board):
+    """Return the (4,) uint64 bitboards of a Board or BitBoard position."""
+    if hasattr(board, "wm"):
+        return np.array([board.wm, board.bm, board.wk, board.bk], dtype=np.uint64)
+    masks = {"w": 0, "b": 0, "W": 0, "B": 0}
+    for row, pieces in enumerate(board.board):
+        for col, piece in enumerate(pieces):
+            if piece != 0:
+                masks[piece] |= 1 << (row * 8 + col)
+    return np.array([masks["w"], masks["b"], masks["W"], masks["B"]], dtype=np.uint64)
+
+
+def _sides(state, white):
+    men = np.where(white, state[:, WM], state[:, BM])
+    kings = np.where(white, state[:, WK], state[:, BK])
+    enemy = np.where(white, state[:, BM] | state[:, BK], state[:, WM] | state[:, WK])
+    empty = ~(state[:, WM] | state[:, BM] | state[:, WK] | state[:, BK])
+    return men, kings, enemy, empty
+
+
+def _men_towards(d, men, white):
+    # Men move forward for their own colour and sideways, never backwards.
+    if d == UP:
+        return np.where(white, men, U64(0))
+    if d == DOWN:
+        return np.where(white, U64(0), men)
+    return men
+
+
+def has_moves(state, white):
+    """True for every position where the side given by `white` has a legal move."""
+    men, kings, enemy, empty = _sides(state, white)
+    mobile = np.zeros(state.shape[0], dtype=bool)
+    for d in range(4):
+        step = shift(kings | _men_towards(d, men, white), d)
+        mobile |= (step & empty) != 0
+        mobile |= (shift(step & enemy, d) & empty) != 0
+    return mobile
+
+
+def winners(state):
+    """Vectorised Board.check_winner: +1 white wins, -1 black wins, 0 still running."""
+    white = np.ones(state.shape[0], dtype=bool)
+    white_out = ((state[:, WM] | state[:, WK]) == 0) | ~has_moves(state, white)
+    black_out = ((state[:, BM] | state[:, BK]) == 0) | ~has_moves(state, ~white)
+    return np.where(white_out, -1, np.where(black_out, 1, 0)).astype(np.int8)
+
+
+def legal_moves(state, white):
+    """Return (N, 4, 7) uint64 landing-square masks indexed by direction and distance - 1.
+
+    As in Board.get_all_moves, a position with any capture only lists its captures.
+    """
+    men, kings, enemy, empty = _sides(state, white)
+    n = state.shape[0]
+    slides = np.zeros((n, 4, MAX_DISTANCE), dtype=np.uint64)
+    captures = np.zeros((n, 4, MAX_DISTANCE), dtype=np.uint64)
+
+    for d in range(4):
+        step = shift(_men_towards(d, men, white), d)
+        slides[:, d, 0] = step & empty
+        captures[:, d, 1] = shift(step & enemy, d) & empty
+        # A king slides over empty squares, or jumps the first enemy onto the square right behind it.
+        reach = kings
+        for k in range(1, MAX_DISTANCE + 1):
+            reach = shift(reach, d)
+            if not reach.any():
+                break
+            if k < MAX_DISTANCE:
+                captures[:, d, k] |= shift(reach & enemy, d) & empty
+            reach &= empty
+            slides[:, d, k - 1] |= reach
+
+    any_capture = (captures != 0).any(axis=(1, 2))
+    return np.where(any_capture[:, None, None], captures, slides)
+
+
+def _nth_bit(masks, n):
+    """Square index of the n-th (0-based) set bit of every mask."""
+    position = np.zeros(masks.shape[0], dtype=np.int64)
+    for width in (32, 16, 8, 4, 2, 1):
+        low = masks & U64((1 << width) - 1)
+        count = np.bitwise_count(low).astype(np.int64)
+        high = n >= count
+        n = np.where(high, n - count, n)
+        masks = np.where(high, masks >> U64(width), low)
+        position += np.where(high, width, 0)
+    return position
+
+
+def _pick(moves, rng):
+    n = moves.shape[0]
+    masks = moves.reshape(n, -1)
+    counts = np.bitwise_count(masks).astype(np.int64)
+    cumulative = np.cumsum(counts, axis=1)
+    choice = (rng.random(n) * cumulative[:, -1]).astype(np.int64)
+    column = (cumulative > choice[:, None]).argmax(axis=1)
+    rows = np.arange(n)
+    nth = choice - (cumulative[rows, column] - counts[rows, column])
+    landing = _nth_bit(masks[rows, column], nth)
+    d, distance = np.divmod(column, MAX_DISTANCE)
+    return d, distance + 1, landing
+
+
+def _bits(squares):
+    return ONE << squares.astype(np.uint64)
+
+
+def _piece_columns(state, bits):
+    return ((state & bits[:, None]) != 0).argmax(axis=1)
+
+
+def _clear_enemy(state, rows, bits, columns):
+    white = (columns == WM) | (columns == WK)
+    state[rows, BM] &= np.where(white, ~bits, ~U64(0))
+    state[rows, BK] &= np.where(white, ~bits, ~U64(0))
+    state[rows, WM] &= np.where(white, ~U64(0), ~bits)
+    state[rows, WK] &= np.where(white, ~U64(0), ~bits)
+
+
+def _promote(state, rows, landing, columns):
+    """Crown men that reached the far row; returns the pieces' columns afterwards."""
+    promote = ((columns == WM) & (landing < 8)) | ((columns == BM) & (landing >= 56))
+    bits, promoted_rows, promoted = _bits(landing[promote]), rows[promote], columns[promote]
+    state[promoted_rows, promoted] &= ~bits
+    state[promoted_rows, promoted + 2] |= bits
+    return np.where(promote, columns + 2, columns)
+
+
+def _piece_captures(state, squares, columns):
+    """(N, 4, 7) capture landing masks, laid out like legal_moves, for the one piece on each square."""
+    bits = _bits(squares)
+    white = (columns == WM) | (columns == WK)
+    is_king = columns >= WK
+    _, _, enemy, empty = _sides(state, white)
+    captures = np.zeros((state.shape[0], 4, MAX_DISTANCE), dtype=np.uint64)
+
+    for d in range(4):
+        man_step = shift(_men_towards(d, np.where(is_king, U64(0), bits), white), d)
+        captures[:, d, 1] = shift(man_step & enemy, d) & empty
+        reach = np.where(is_king, bits, U64(0))
+        for k in range(1, MAX_DISTANCE):
+            reach = shift(reach, d)
+            if not reach.any():
+                break
+            captures[:, d, k] |= shift(reach & enemy, d) & empty
+            reach &= empty
+    return captures
+
+
+def apply_moves(state, d, distance, landing, rng):
+    """Play one move on every position; a capture goes on jumping, at random, until the chain ends."""
+    rows = np.arange(state.shape[0])
+    origin = landing - distance * STEPS[d]
+    columns = _piece_columns(state, _bits(origin))
+    state[rows, columns] &= ~_bits(origin)
+    state[rows, columns] |= _bits(landing)
+    # A capture lands right behind the enemy it took; a step or king slide only passes empty squares.
+    behind = _bits(landing - STEPS[d])
+    occupied = state[:, WM] | state[:, BM] | state[:, WK] | state[:, BK]
+    jumped = (distance > 1) & ((occupied & behind) != 0)
+    _clear_enemy(state, rows[jumped], behind[jumped], columns[jumped])
+    columns = _promote(state, rows, landing, columns)
+
+    # A man crowned mid-chain carries on capturing as a king, as in Board.capture_chains.
+    rows, landing, columns = rows[jumped], landing[jumped], columns[jumped]
+    while rows.shape[0]:
+        captures = _piece_captures(state[rows], landing, columns)
+        more = captures.any(axis=(1, 2))
+        rows, landing, columns, captures = rows[more], landing[more], columns[more], captures[more]
+        if not rows.shape[0]:
+            break
+        d, distance, new_landing = _pick(captures, rng)
+        state[rows, columns] &= ~_bits(landing)
+        state[rows, columns] |= _bits(new_landing)
+        _clear_enemy(state, rows, _bits(new_landing - STEPS[d]), columns)
+        landing = new_landing
+        columns = _promote(state, rows, landing, columns)
+
+
+def simulate(positions, colors, turn_limit=100, rng=None):
+    """Play random games from every position at once.
+
+    `positions` is (N, 4) uint64 as returned by encode() and `colors` (N,) holds
+    the side to move as +1/-1. Returns an (N,) int8 array: +1 white won, -1 black
+    won, 0 unresolved after `turn_limit` plies, as in MCTSPlayer.simulate_random_game.
+    """
+    rng = rng or np.random.default_rng()
+    state = np.array(positions, dtype=np.uint64).reshape(-1, 4)
+    white = np.asarray(colors) > 0
+    results = np.zeros(state.shape[0], dtype=np.int8)
+    running = np.arange(state.shape[0])
+
+    for _ in range(turn_limit):
+        outcome = winners(state[running])
+        done = outcome != 0
+        results[running[done]] = outcome[done]
+        running = running[~done]
+        if not running.shape[0]:
+            break
+
+        sub = state[running]
+        d, distance, landing = _pick(legal_moves(sub, white[running]), rng)
+        apply_moves(sub, d, distance, landing, rng)
+        state[running] = sub
+        white[running] = ~white[running]
+
+    return results
@@ -1,131 +1,265 @@
 import copy
 import random
 import math
+import multiprocessing
+import time
+from agents.base import Agent
+from tablebase import WIN, DRAW
 
 class MCTSNode:
-    def __init__(self, board, color, parent=None, move=None):
-        self.board = board
+    # Nodes hold no board: the search replays moves from the root on one working board.
+    __slots__ = ("parent", "move", "color", "key", "children", "moves", "untried", "visits", "wins")
+
+    def __init__(self, color, key, parent=None, move=None):
         self.color = color  # Player to move *after* this node's move
+        self.key = key  # Zobrist key of the position, used to find the node again on the next turn
         self.parent = parent
         self.move = move
         self.children = []
+        self.moves = None  # legal moves in random order, generated on the first expansion
+        self.untried = 0  # moves[untried:] have no child yet
         self.visits = 0
         self.wins = 0
 
-    def get_untried_moves(self):
-        all_moves = self.board.get_all_moves(self.color)
-        tried_moves = [child.move for child in self.children]
-        return [move for move in all_moves if move not in tried_moves]
+    def next_untried_move(self, board, legal_moves):
+        if self.moves is None:
+            self.moves = legal_moves(board, self.color)
+            random.shuffle(self.moves)
+        if self.untried == len(self.moves):
+            return None
+        self.untried += 1
+        return self.moves[self.untried - 1]
 
     def is_fully_expanded(self):
-        return len(self.get_untried_moves()) == 0
+        return self.moves is not None and self.untried == len(self.moves)
 
     def best_child(self, c_param=1.4):
         return max(self.children, key=lambda child:
                    (child.wins / (child.visits + 1e-6)) +
                    c_param * math.sqrt(math.log(self.visits + 1) / (child.visits + 1e-6)))
 
-class MCTSPlayer:
-    def __init__(self, color, simulations=100, exploration_constant=1.4):
-        self.color = color
-        self.simulations = simulations
-        self.c_param = exploration_constant
+# The ticket shared with an AgentWorker, handed to the pool processes so that a cancel reaches them too.
+_WORKER = {}
+
+
+def _init_root_worker(cancel):
+    _WORKER["cancel"] = cancel
+
+
+def _root_search(args):
+    board, color, simulations, c_param, batch_size, seed, deadline, tablebase, ticket = args
+    random.seed(seed)
+    player = MCTSPlayer(color, simulations, c_param, batch_size=batch_size, tablebase=tablebase)
+    player.cancel = _WORKER.get("cancel")
+    player.ticket = ticket
+    player.start_search(deadline)
+    root = player.search(board)
+    return [(child.move, child.visits, child.wins) for child in root.children]
+
 
-    def select_best_jump(self, board, r, c, jump_options):
-        # Select jump that captures most pieces via lookahead
-        max_captures = -1
-        best_move = jump_options[0]
-        for jump in jump_options:
-            temp = copy.deepcopy(board)
-            temp.move_piece((r, c), jump)
-            count = self.count_additional_jumps(temp, jump[0], jump[1])
-            if count > max_captures:
-                max_captures = count
-                best_move = jump
-        return best_move
-
-    def count_additional_jumps(self, board, r, c):
-        total = 0
-        while True:
-            next_jumps = board.get_valid_moves(r, c, only_captures=True)
-            if not next_jumps:
-                break
-            total += 1
-            r, c = next_jumps[0]  # assume we keep taking the first option
-        return total
-        self.color = color
+class MCTSPlayer(Agent):
+    def __init__(self, color, simulations=100, exploration_constant=1.4, workers=1, batch_size=1,
+                 tablebase=None, position_cache=None):
+        super().__init__(color)
+        self.position_cache = position_cache
         self.simulations = simulations
         self.c_param = exploration_constant
+        self.workers = workers  # >1 splits the simulations over independent trees (root parallelisation)
+        self.batch_size = batch_size  # >1 plays rollouts for that many leaves at once with NumPy
+        self.tablebase = tablebase  # rollouts stop at the first position it has solved
+        self.pool = None
+        self.simulations_run = 0
+        self.rollout_plies = 0  # rollout length and time, counted only when instrumented
+        self.max_rollout_plies = 0
+        self.rollout_seconds = 0.0
+        self.root = None  # tree kept from our previous move, reused when the game reaches one of its grandchildren
 
-    def get_move(self, board):
-        root = MCTSNode(copy.deepcopy(board), self.color)
-
-        for _ in range(self.simulations):
-            node = root
-
-            # Selection
-            while node.children and node.is_fully_expanded():
-                node = node.best_child(self.c_param)
-
-            # Expansion
-            untried_moves = node.get_untried_moves()
-            if untried_moves:
-                move = random.choice(untried_moves)
-                temp_board = copy.deepcopy(node.board)
-                jumped, (r, c) = temp_board.move_piece(*move)
-
-                # Handle chained jumps
-                if jumped:
-                    while True:
-                        more_jumps = temp_board.get_valid_moves(r, c, only_captures=True)
-                        if not more_jumps:
-                            break
-                        jump_to = self.select_best_jump(temp_board, r, c, more_jumps)
-                        jumped, (r, c) = temp_board.move_piece((r, c), jump_to)
-
-                next_color = "b" if node.color == "w" else "w"
-                child = MCTSNode(temp_board, next_color, parent=node, move=move)
-                node.children.append(child)
-                node = child
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = state["cancel"] = None
+        return state
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def get_move(self, board, deadline=None):
+        self.start_search(deadline)
+        # Pool workers are daemonic and cannot start their own pool, e.g. inside tournament.py.
+        if self.workers > 1 and not multiprocessing.current_process().daemon:
+            move, simulations = self.parallel_move(board)
+            return self.finish_search(move, simulations=simulations)
+
+        root = self.search(board, self.reuse_root(board))
+        counters = self.search_counters(root) if self.instrumented else {}
+        if not root.children:
+            self.root = None
+            return self.finish_search(None, simulations=self.simulations_run, **counters)
+        best = max(root.children, key=lambda c: c.visits)
+        best.parent = None  # drop the siblings; only the opponent's replies to our move can be reused
+        self.root = best
+        return self.finish_search(best.move, simulations=self.simulations_run, **counters)
+
+    def search_counters(self, root):
+        tree_nodes = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            tree_nodes += 1
+            stack.extend(node.children)
+        return {"tree_nodes": tree_nodes, "root_visits": root.visits,
+                "mean_rollout_plies": self.rollout_plies / max(1, self.simulations_run),
+                "max_rollout_plies": self.max_rollout_plies, "rollout_seconds": self.rollout_seconds}
+
+    def keep_searching(self, done, target):
+        # A deadline replaces the simulation count as the budget; one simulation always runs.
+        if done == 0:
+            return True
+        if self.out_of_time():
+            return False
+        return self.deadline is not None or done < target
+
+    def reuse_root(self, board):
+        previous, self.root = self.root, None
+        if previous is None:
+            return None
+        for reply in previous.children:
+            if reply.color == self.color and reply.key == board.hash:
+                reply.parent = None
+                reply.move = None
+                return reply
+        return None
+
+    def parallel_move(self, board):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers, _init_root_worker, (self.cancel,))
+        share, extra = divmod(self.simulations, self.workers)
+        jobs = [(board, self.color, share + (1 if i < extra else 0), self.c_param, self.batch_size,
+                 random.getrandbits(32), self.deadline, self.tablebase, self.ticket) for i in range(self.workers)]
+        visits = {}
+        for children in self.pool.map(_root_search, jobs):
+            for move, child_visits, _ in children:
+                visits[move] = visits.get(move, 0) + child_visits
+        if not visits:
+            return None, 0
+        return max(visits, key=visits.get), sum(visits.values())
+
+    def search(self, board, root=None):
+        board = copy.deepcopy(board)
+        if root is None:
+            root = MCTSNode(self.color, board.hash)
+        self.simulations_run = 0
+        self.rollout_plies = self.max_rollout_plies = 0
+        self.rollout_seconds = 0.0
+        if self.batch_size > 1:
+            return self.batch_search(board, root)
+
+        target = self.simulations - root.visits
+        while self.keep_searching(self.simulations_run, target):
+            undo_stack = []
+            node = self.select_leaf(root, board, undo_stack)
 
             # Simulation (from the opponent's turn)
             sim_start_color = "b" if node.color == "w" else "w"
-            winner = self.simulate_random_game(node.board, sim_start_color)
+            if self.instrumented:
+                start = time.perf_counter()
+                winner = self.simulate_random_game(board, sim_start_color)
+                self.rollout_seconds += time.perf_counter() - start
+            else:
+                winner = self.simulate_random_game(board, sim_start_color)
+
+            while undo_stack:
+                board.unmake_move(undo_stack.pop())
 
             # Backpropagation
             self.backpropagate(node, winner)
+            self.simulations_run += 1
 
-        if not root.children:
-            return None
+        return root
+
+    def select_leaf(self, root, board, undo_stack):
+        node = root
+
+        # Selection
+        while node.children and node.is_fully_expanded():
+            node = node.best_child(self.c_param)
+            undo_stack.append(board.make_move(*node.move))
 
-        best_move = max(root.children, key=lambda c: c.visits).move
-        return best_move
+        # Expansion
+        move = node.next_untried_move(board, self.legal_moves)
+        if move is not None:
+            undo_stack.append(board.make_move(*move))
+            next_color = "b" if node.color == "w" else "w"
+            child = MCTSNode(next_color, board.hash, parent=node, move=move)
+            node.children.append(child)
+            node = child
+
+        return node
+
+    def batch_search(self, board, root):
+        import numpy as np
+        from agents import batch_rollout
+
+        rng = np.random.default_rng(random.getrandbits(64))
+        target = self.simulations - root.visits
+        while self.keep_searching(self.simulations_run, target):
+            batch = self.batch_size
+            if self.deadline is None:
+                batch = min(batch, target - self.simulations_run)
+            leaves = []
+            positions = []
+            colors = []
+            for _ in range(max(1, batch)):
+                undo_stack = []
+                node = self.select_leaf(root, board, undo_stack)
+                positions.append(batch_rollout.encode(board))
+                colors.append(-1 if node.color == "w" else 1)  # simulation starts with the opponent's turn
+                while undo_stack:
+                    board.unmake_move(undo_stack.pop())
+                # Count the visit now (a virtual loss) so the rest of the batch spreads over other leaves.
+                self.backpropagate(node, None)
+                leaves.append(node)
+
+            start = time.perf_counter()
+            results = batch_rollout.simulate(np.array(positions), np.array(colors), rng=rng)
+            self.rollout_seconds += time.perf_counter() - start
+            mine = 1 if self.color == "w" else -1
+            for node, result in zip(leaves, results):
+                if result == mine:
+                    while node is not None:
+                        node.wins += 1
+                        node = node.parent
+            self.simulations_run += len(leaves)
+
+        return root
 
     def simulate_random_game(self, board, color):
         temp_board = copy.deepcopy(board)
         current_color = color
         turn_limit = 100
 
-        for _ in range(turn_limit):
-            winner = temp_board.check_winner()
+        for ply in range(turn_limit):
+            if self.instrumented:
+                self.rollout_plies += 1
+                self.max_rollout_plies = max(self.max_rollout_plies, ply + 1)
+            winner = self.winner(temp_board)
             if winner is not None:
                 return winner
 
-            moves = temp_board.get_all_moves(current_color)
+            if self.tablebase is not None:
+                known = self.tablebase.probe(temp_board, current_color)
+                if known is not None:
+                    result, _ = known
+                    if result == DRAW:
+                        return None
+                    return current_color if result == WIN else ("b" if current_color == "w" else "w")
+
+            moves = self.legal_moves(temp_board, current_color)
             if not moves:
                 return "b" if current_color == "w" else "w"
 
-            move = random.choice(moves)
-            jumped, (r, c) = temp_board.move_piece(*move)
-
-            if jumped:
-                while True:
-                    more_jumps = temp_board.get_valid_moves(r, c, only_captures=True)
-                    if not more_jumps:
-                        break
-                    jump_to = self.select_best_jump(temp_board, r, c, more_jumps)
-                    jumped, (r, c) = temp_board.move_piece((r, c), jump_to)
-
+            temp_board.move_piece(*random.choice(moves))
             current_color = "b" if current_color == "w" else "w"
 
         return None  # draw or unresolved
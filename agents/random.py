@@ -1,11 +1,10 @@
 import random
+from agents.base import Agent
 
-class RandomPlayer:
-    def __init__(self, color):
-        self.color = color
-
-    def get_move(self, board):
-        valid_moves = board.get_all_moves(self.color)
+class RandomPlayer(Agent):
+    def get_move(self, board, deadline=None):
+        self.start_search(deadline)
+        valid_moves = self.legal_moves(board, self.color)
         if not valid_moves:
-            return None
-        return random.choice(valid_moves)
\ No newline at end of file
+            return self.finish_search(None)
+        return self.finish_search(random.choice(valid_moves))
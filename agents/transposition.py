@@ -0,0 +1,59 @@
+from array import array
+
+EXACT, LOWER, UPPER = 1, 2, 3
+NO_MOVE = 0xFFFF
+
+# Bytes per slot: key (8) + score (4) + move (2) + depth (1) + flag (1) + generation (1).
+ENTRY_BYTES = 17
+
+
+def encode_move(move):
+    # A capture path is stored by its first and last squares; callers match the code
+    # against the moves they generate to get the full path back.
+    (sr, sc), (er, ec) = move[0], move[-1]
+    return (sr * 8 + sc) << 6 | (er * 8 + ec)
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results; memory never grows past `megabytes`."""
+
+    def __init__(self, megabytes=4):
+        size = 1
+        while size * 2 * ENTRY_BYTES <= megabytes * 1024 * 1024:
+            size *= 2
+        self.size = size
+        self.mask = size - 1
+        self.generation = 0
+        self.clear()
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        self.keys = array("Q", bytes(8 * self.size))
+        self.scores = array("i", bytes(4 * self.size))
+        self.moves = array("H", [NO_MOVE]) * self.size
+        self.depths = array("b", bytes(self.size))
+        self.flags = array("B", bytes(self.size))
+        self.generations = array("B", bytes(self.size))
+
+    def probe(self, key):
+        """Return (depth, flag, score, move code) for `key`, or None on a miss."""
+        i = key & self.mask
+        if self.flags[i] == 0 or self.keys[i] != key:
+            return None
+        code = self.moves[i]
+        return self.depths[i], self.flags[i], self.scores[i], None if code == NO_MOVE else code
+
+    def store(self, key, depth, flag, score, move):
+        i = key & self.mask
+        # Keep a deeper result from the current search unless it is for this very position.
+        if (self.flags[i] and self.keys[i] != key and self.generations[i] == self.generation
+                and self.depths[i] > depth):
+            return
+        self.keys[i] = key
+        self.depths[i] = depth
+        self.flags[i] = flag
+        self.scores[i] = score
+        self.moves[i] = NO_MOVE if move is None else encode_move(move)
+        self.generations[i] = self.generation
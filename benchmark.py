@@ -0,0 +1,202 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from board import new_board, CHAIN_CACHE
+from constants import *
+from agents.abp import ABPPlayer
+from agents.mcts import MCTSPlayer
+
+# Fixed test positions, row 0 at the top: w/b men, W/B kings, "." empty.
+POSITIONS = {
+    "start": None,
+    "midgame": (
+        "........",
+        ".bb.b.bb",
+        "b..bb.b.",
+        "...w....",
+        ".b..w...",
+        "ww.w..ww",
+        ".w.ww.w.",
+        "........",
+    ),
+    "kings": (
+        "....B...",
+        "..b.....",
+        ".b...b..",
+        "........",
+        "...W....",
+        "..w..w..",
+        "........",
+        "W.......",
+    ),
+    "captures": (
+        "........",
+        "..b.b...",
+        "..w.....",
+        "........",
+        ".bwb.B..",
+        "........",
+        "..w..W..",
+        "........",
+    ),
+}
+
+PERFT_DEPTH = {"start": 5, "midgame": 6, "kings": 4, "captures": 6}
+ABP_DEPTHS = (3, 4)
+MCTS_BUDGETS = (200, 1000)
+PARALLEL_POSITION = "midgame"
+PARALLEL_WORKERS = (1, 2, 4)
+PARALLEL_SECONDS = 2.0
+
+
+def load_position(name):
+    board = new_board()
+    rows = POSITIONS[name]
+    if rows is not None:
+        for row, line in enumerate(rows):
+            for col, char in enumerate(line):
+                board._put(row, col, 0 if char == "." else char)
+    return board
+
+
+def perft(board, color, depth):
+    """Number of move sequences of length `depth` from this position, capture sequences counting as one move."""
+    if depth == 0:
+        return 1
+    moves = board.get_all_moves(color)
+    if depth == 1:
+        return len(moves)
+    opponent = "b" if color == "w" else "w"
+    nodes = 0
+    for move in moves:
+        undo = board.make_move(*move)
+        nodes += perft(board, opponent, depth - 1)
+        board.unmake_move(undo)
+    return nodes
+
+
+def best_of(repeats, run):
+    """Call `run` `repeats` times and keep the fastest, which is the least disturbed by other load."""
+    best = None
+    for _ in range(repeats):
+        CHAIN_CACHE.clear()  # every run starts cold, or repeats would only measure cache hits
+        start = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[1]:
+            best = result, seconds
+    return best
+
+
+def run_benchmarks(quick=False, repeats=3):
+    results = {"python": platform.python_version(), "board": type(new_board()).__name__,
+               "perft": {}, "abp": {}, "mcts": {}}
+    for name in POSITIONS:
+        depth = PERFT_DEPTH[name] - (1 if quick else 0)
+        nodes, seconds = best_of(repeats, lambda: perft(load_position(name), "w", depth))
+        results["perft"][name] = {"depth": depth, "nodes": nodes, "seconds": seconds,
+                                  "nodes_per_second": nodes / seconds}
+
+        for depth in ABP_DEPTHS[:1] if quick else ABP_DEPTHS:
+            def search():
+                player = ABPPlayer("w", depth=depth)
+                player.get_move(load_position(name))
+                return player.nodes
+
+            nodes, seconds = best_of(repeats, search)
+            results["abp"][f"{name}/d{depth}"] = {"nodes": nodes, "seconds": seconds,
+                                                   "nodes_per_second": nodes / seconds}
+
+        for simulations in MCTS_BUDGETS[:1] if quick else MCTS_BUDGETS:
+            def search():
+                random.seed(0)
+                player = MCTSPlayer("w", simulations=simulations)
+                player.get_move(load_position(name))
+                return player.simulations_run
+
+            done, seconds = best_of(repeats, search)
+            results["mcts"][f"{name}/s{simulations}"] = {"simulations": done, "seconds": seconds,
+                                                        "simulations_per_second": done / seconds}
+
+    results["parallel"] = parallel_depths(PARALLEL_SECONDS / 2 if quick else PARALLEL_SECONDS,
+                                          PARALLEL_WORKERS[:2] if quick else PARALLEL_WORKERS)
+    return results
+
+
+def parallel_depths(seconds, worker_counts):
+    """Depth a timed ABP search reaches on PARALLEL_POSITION with each number of root-splitting workers."""
+    depths = {}
+    for workers in worker_counts:
+        player = ABPPlayer("w", time_limit=seconds, workers=workers)
+        if workers > 1:
+            player.start_pool()  # the pool's start-up is not charged to the search
+        try:
+            player.get_move(load_position(PARALLEL_POSITION))
+        finally:
+            player.close()
+        depths[f"{PARALLEL_POSITION}/w{workers}"] = {"depth": player.depth_reached, "nodes": player.nodes,
+                                                     "seconds": player.stats["elapsed"]}
+    return depths
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of problems: perft counts that changed and rates more than `tolerance` below the baseline."""
+    problems = []
+    for name, entry in results["perft"].items():
+        old = baseline.get("perft", {}).get(name)
+        if old and old["depth"] == entry["depth"] and old["nodes"] != entry["nodes"]:
+            problems.append(f"perft {name}: {entry['nodes']} nodes, baseline {old['nodes']}")
+    for section, rate in (("perft", "nodes_per_second"), ("abp", "nodes_per_second"),
+                          ("mcts", "simulations_per_second")):
+        for name, entry in results[section].items():
+            old = baseline.get(section, {}).get(name)
+            if old and entry[rate] < old[rate] * (1 - tolerance):
+                problems.append(f"{section} {name}: {entry[rate]:.0f} {rate}, baseline {old[rate]:.0f} "
+                                f"({entry[rate] / old[rate] - 1:+.0%})")
+    return problems
+
+
+def print_results(results, baseline=None):
+    for section, rate in (("perft", "nodes_per_second"), ("abp", "nodes_per_second"),
+                          ("mcts", "simulations_per_second")):
+        for name, entry in results[section].items():
+            line = f"{section:6} {name:18} {entry[rate]:12.0f} {rate}"
+            old = (baseline or {}).get(section, {}).get(name)
+            if old:
+                line += f"  ({entry[rate] / old[rate] - 1:+.1%} vs baseline)"
+            print(line)
+    for name, entry in results.get("parallel", {}).items():
+        print(f"{'abp':6} {name:18} {entry['depth']:12} depth in {entry['seconds']:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure move generation, ABP and MCTS speed on fixed positions.")
+    parser.add_argument("--output", default="benchmark.json", help="where to write the results as JSON")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before failing")
+    parser.add_argument("--quick", action="store_true", help="smaller depths and budgets")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per measurement, the fastest is kept")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.quick, args.repeats)
+    with open(args.output, "w") as out:
+        json.dump(results, out, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if baseline is not None:
+        problems = compare(results, baseline, args.tolerance)
+        for problem in problems:
+            print("REGRESSION", problem)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+from board import Board, CHAIN_CACHE, CHAIN_CACHE_SIZE, ZOBRIST, PIECE_SQUARE, zobrist_key, piece_square_score
+from constants import *
+
+# Square index is row * 8 + col, bit 0 is the top-left corner.
+FULL = (1 << 64) - 1
+COL0 = sum(1 << (row * 8) for row in range(8))
+COL7 = COL0 << 7
+NOT_COL0 = FULL ^ COL0
+NOT_COL7 = FULL ^ COL7
+
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+OPPOSITE = (DOWN, UP, RIGHT, LEFT)
+DELTAS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+KING_DIRS = (UP, DOWN, LEFT, RIGHT)
+MAN_DIRS = {"w": (UP, LEFT, RIGHT), "b": (DOWN, LEFT, RIGHT)}
+
+
+def _build_rays():
+    rays = [[() for _ in range(64)] for _ in range(4)]
+    for d, (dr, dc) in enumerate(DELTAS):
+        for sq in range(64):
+            r, c = divmod(sq, 8)
+            ray = []
+            r, c = r + dr, c + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                ray.append(r * 8 + c)
+                r, c = r + dr, c + dc
+            rays[d][sq] = tuple(ray)
+    return rays
+
+
+RAYS = _build_rays()
+# BEHIND[d][sq]: the next square after sq in direction d, 64 (never empty) off the board.
+BEHIND = [[RAYS[d][sq][0] if RAYS[d][sq] else 64 for sq in range(64)] for d in range(4)]
+# RAY_MASK[d][sq]: every square seen from sq in direction d. The nearest occupied one is the
+# highest set bit for UP and LEFT, the lowest for DOWN and RIGHT.
+RAY_MASK = [[sum(1 << t for t in RAYS[d][sq]) for sq in range(64)] for d in range(4)]
+# BETWEEN[a][b]: squares strictly between two squares on one line, 0 when they share none.
+BETWEEN = [[0] * 64 for _ in range(64)]
+for _d in range(4):
+    for _sq in range(64):
+        _seen = 0
+        for _t in RAYS[_d][_sq]:
+            BETWEEN[_sq][_t] = _seen
+            _seen |= 1 << _t
+# MAN_JUMPS[color][sq]: (square jumped over, landing square) for each direction a man captures in.
+MAN_JUMPS = {color: [tuple((RAYS[d][sq][0], RAYS[d][sq][1]) for d in dirs if len(RAYS[d][sq]) > 1)
+                     for sq in range(64)]
+             for color, dirs in (("w", (UP, LEFT, RIGHT)), ("b", (DOWN, LEFT, RIGHT)))}
+CROWN_ROW = {"w": 0xFF, "b": 0xFF << 56}
+SQUARE = [(sq >> 3, sq & 7) for sq in range(64)]
+
+
+def shift(bb, d):
+    if d == UP:
+        return bb >> 8
+    if d == DOWN:
+        return (bb << 8) & FULL
+    if d == LEFT:
+        return (bb & NOT_COL0) >> 1
+    return (bb & NOT_COL7) << 1
+
+
+def squares(bb):
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def _chains(sq, color, king, enemy, empty):
+    """Capture sequences of one piece, worked out on the masks alone.
+
+    Follows Board.capture_chains: a captured piece leaves the board at once, a king lands on the
+    square right behind the piece it takes, and a man crowned during a capture goes on as a king.
+    """
+    chains = []
+    if king:
+        for d in KING_DIRS:
+            ray = RAY_MASK[d][sq]
+            blockers = ray & ~empty
+            if not blockers:
+                continue
+            over = blockers.bit_length() - 1 if d == UP or d == LEFT else (blockers & -blockers).bit_length() - 1
+            if not enemy >> over & 1:
+                continue
+            land = BEHIND[d][over]
+            if empty >> land & 1:
+                _extend(chains, sq, over, land, color, True, enemy, empty)
+    else:
+        for over, land in MAN_JUMPS[color][sq]:
+            if enemy >> over & 1 and empty >> land & 1:
+                _extend(chains, sq, over, land, color, CROWN_ROW[color] >> land & 1, enemy, empty)
+    return chains
+
+
+def _extend(chains, sq, over, land, color, king, enemy, empty):
+    rest = _chains(land, color, king, enemy ^ (1 << over), (empty | 1 << sq | 1 << over) ^ (1 << land))
+    landing = SQUARE[land]
+    if rest:
+        chains.extend((landing,) + chain for chain in rest)
+    else:
+        chains.append((landing,))
+
+
+class BitBoard(Board):
+    """Drop-in replacement for Board that keeps the position as four 64-bit masks."""
+
+    def __init__(self):
+        self.wm = 0
+        self.bm = 0
+        self.wk = 0
+        self.bk = 0
+        self._grid = None
+        self.last_move = []
+        self.create_board()
+
+    def create_board(self):
+        self.bm = 0xFF << 8 | 0xFF << 16
+        self.wm = 0xFF << 40 | 0xFF << 48
+        self.wk = self.bk = 0
+        self._grid = None
+        self.hash = zobrist_key(self.board)
+        self.score = piece_square_score(self.board)
+
+    def __deepcopy__(self, memo):
+        other = BitBoard.__new__(BitBoard)
+        other.wm, other.bm, other.wk, other.bk = self.wm, self.bm, self.wk, self.bk
+        other.hash = self.hash
+        other.score = self.score
+        other._grid = None
+        other.last_move = list(self.last_move)
+        return other
+
+    @property
+    def board(self):
+        """The position as an 8x8 grid, rebuilt only after the position changed; treat it as read-only."""
+        if self._grid is None:
+            grid = [[0] * COLS for _ in range(ROWS)]
+            for piece, bb in (("w", self.wm), ("b", self.bm), ("W", self.wk), ("B", self.bk)):
+                for sq in squares(bb):
+                    grid[sq >> 3][sq & 7] = piece
+            self._grid = grid
+        return self._grid
+
+    def piece_at(self, sq):
+        bit = 1 << sq
+        if self.wm & bit:
+            return "w"
+        if self.bm & bit:
+            return "b"
+        if self.wk & bit:
+            return "W"
+        if self.bk & bit:
+            return "B"
+        return 0
+
+    def set_piece(self, sq, piece):
+        old = self.piece_at(sq)
+        if old == piece:
+            return
+        self._grid = None
+        bit = 1 << sq
+        if old != 0:
+            self.hash ^= ZOBRIST[old][sq]
+            self.score -= PIECE_SQUARE[old][sq]
+            mask = FULL ^ bit
+            self.wm &= mask
+            self.bm &= mask
+            self.wk &= mask
+            self.bk &= mask
+        if piece != 0:
+            self.hash ^= ZOBRIST[piece][sq]
+            self.score += PIECE_SQUARE[piece][sq]
+        if piece == "w":
+            self.wm |= bit
+        elif piece == "b":
+            self.bm |= bit
+        elif piece == "W":
+            self.wk |= bit
+        elif piece == "B":
+            self.bk |= bit
+
+    def _sides(self, color):
+        if color == "w":
+            return self.wm, self.wk, self.bm | self.bk
+        return self.bm, self.bk, self.wm | self.wk
+
+    def _king_moves(self, sq, enemy, empty, only_captures):
+        moves = []
+        for d in KING_DIRS:
+            ray = RAYS[d][sq]
+            for i, t in enumerate(ray):
+                bit = 1 << t
+                if empty & bit:
+                    if not only_captures:
+                        moves.append(t)
+                    continue
+                if enemy & bit and i + 1 < len(ray) and empty & (1 << ray[i + 1]):
+                    moves.append(ray[i + 1])
+                break
+        return moves
+
+    def get_valid_moves(self, row, col, only_captures=False):
+        sq = row * 8 + col
+        piece = self.piece_at(sq)
+        if piece == 0:
+            return []
+        color = piece.lower()
+        _, _, enemy = self._sides(color)
+        empty = FULL ^ (self.wm | self.bm | self.wk | self.bk)
+
+        if piece.isupper():
+            targets = self._king_moves(sq, enemy, empty, only_captures)
+        else:
+            targets = []
+            for d in MAN_DIRS[color]:
+                ray = RAYS[d][sq]
+                if not ray:
+                    continue
+                bit = 1 << ray[0]
+                if empty & bit:
+                    if not only_captures:
+                        targets.append(ray[0])
+                elif enemy & bit and len(ray) > 1 and empty & (1 << ray[1]):
+                    targets.append(ray[1])
+        return [(t >> 3, t & 7) for t in targets]
+
+    def get_all_moves(self, color):
+        men, kings, enemy = self._sides(color)
+        empty = FULL ^ (self.wm | self.bm | self.wk | self.bk)
+        if color == "w":
+            forward_step = -8
+            forward = (men >> 8 & empty) << 8
+            forward_jump = ((men >> 8 & enemy) >> 8 & empty) << 16
+        else:
+            forward_step = 8
+            forward = (men << 8 & empty) >> 8
+            forward_jump = ((men << 8 & enemy) << 8 & empty) >> 16
+        left_jump = ((((men & NOT_COL0) >> 1 & enemy) & NOT_COL0) >> 1 & empty) << 2
+        right_jump = ((((men & NOT_COL7) << 1 & enemy) & NOT_COL7) << 1 & empty) >> 2
+
+        # Every piece that may capture, in square order like Board.get_all_moves.
+        must_jump = []
+        candidates = forward_jump | left_jump | right_jump | kings
+        while candidates:
+            bit = candidates & -candidates
+            candidates ^= bit
+            sq = bit.bit_length() - 1
+            start = SQUARE[sq]
+            for chain in self._piece_chains(sq, color, kings & bit, enemy, empty):
+                must_jump.append((start,) + chain)
+        if must_jump:
+            return must_jump
+
+        left = ((men & NOT_COL0) >> 1 & empty) << 1
+        right = ((men & NOT_COL7) << 1 & empty) >> 1
+        all_moves = []
+        movers = forward | left | right | kings
+        while movers:
+            bit = movers & -movers
+            movers ^= bit
+            sq = bit.bit_length() - 1
+            start = SQUARE[sq]
+            if kings & bit:
+                for d in KING_DIRS:
+                    for t in RAYS[d][sq]:
+                        if not empty >> t & 1:
+                            break
+                        all_moves.append((start, SQUARE[t]))
+            else:
+                if forward & bit:
+                    all_moves.append((start, SQUARE[sq + forward_step]))
+                if left & bit:
+                    all_moves.append((start, SQUARE[sq - 1]))
+                if right & bit:
+                    all_moves.append((start, SQUARE[sq + 1]))
+        return all_moves
+
+    def capture_chains(self, row, col):
+        sq = row * 8 + col
+        piece = self.piece_at(sq)
+        if piece == 0:
+            return ()
+        color = piece.lower()
+        _, _, enemy = self._sides(color)
+        empty = FULL ^ (self.wm | self.bm | self.wk | self.bk)
+        return self._piece_chains(sq, color, piece.isupper(), enemy, empty)
+
+    def _piece_chains(self, sq, color, king, enemy, empty):
+        # Memoised under the same (Zobrist key, row, col) keys as Board.capture_chains.
+        key = (self.hash, sq >> 3, sq & 7)
+        chains = CHAIN_CACHE.get(key)
+        if chains is not None:
+            return chains
+        chains = tuple(_chains(sq, color, king, enemy, empty))
+        if chains:
+            if len(CHAIN_CACHE) >= CHAIN_CACHE_SIZE:
+                CHAIN_CACHE.clear()
+            CHAIN_CACHE[key] = chains
+        return chains
+
+    def _step(self, start, end):
+        s = start[0] * 8 + start[1]
+        e = end[0] * 8 + end[1]
+        piece = self.piece_at(s)
+        enemy = self.bm | self.bk if piece in ("w", "W") else self.wm | self.wk
+        captured = None
+        jumped = BETWEEN[s][e] & enemy
+        if jumped:
+            # The piece takes the first enemy on its way.
+            c = (jumped & -jumped).bit_length() - 1 if e > s else jumped.bit_length() - 1
+            captured = (SQUARE[c], self.piece_at(c))
+            self.set_piece(c, 0)
+        self.set_piece(s, 0)
+        if piece == "w" and e < 8:
+            self.set_piece(e, "W")
+        elif piece == "b" and e >= 56:
+            self.set_piece(e, "B")
+        else:
+            self.set_piece(e, piece)
+        return start, end, piece, captured
+
+    def _get(self, row, col):
+        return self.piece_at(row * 8 + col)
+
+    def _put(self, row, col, piece):
+        self.set_piece(row * 8 + col, piece)
+
+    def has_moves(self, color):
+        men, kings, enemy = self._sides(color)
+        empty = FULL ^ (self.wm | self.bm | self.wk | self.bk)
+        for d in KING_DIRS:
+            movers = kings | men if d in MAN_DIRS[color] else kings
+            if not movers:
+                continue
+            if shift(movers, d) & empty:
+                return True
+            if shift(shift(movers, d) & enemy, d) & empty:
+                return True
+        return False
+
+    def check_winner(self):
+        if not (self.wm | self.wk) or not self.has_moves("w"):
+            return "b"
+        if not (self.bm | self.bk) or not self.has_moves("b"):
+            return "w"
+        return None
@@ -1,8 +1,139 @@
-import pygame
 import math
+import random
 import time
 from constants import *
 
+_zobrist_rng = random.Random(20240601)
+ZOBRIST = {piece: [_zobrist_rng.getrandbits(64) for _ in range(ROWS * COLS)] for piece in "wbWB"}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+
+def zobrist_key(grid):
+    key = 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = grid[row][col]
+            if piece != 0:
+                key ^= ZOBRIST[piece][row * COLS + col]
+    return key
+
+
+# Static evaluation terms for each piece on each square, in hundredths of a man, positive for White.
+# Men gain value as they advance towards promotion; kings are worth a little more near the centre.
+MAN_ADVANCE = (0, 0, 2, 4, 7, 11, 16, 22)  # indexed by rows advanced from the man's own back row
+KING_CENTRE = (0, 2, 4, 6)  # indexed by distance from the edge
+
+
+def _build_piece_square():
+    table = {piece: [0] * (ROWS * COLS) for piece in "wbWB"}
+    for row in range(ROWS):
+        for col in range(COLS):
+            sq = row * COLS + col
+            table["w"][sq] = 100 + MAN_ADVANCE[ROWS - 1 - row]
+            table["b"][sq] = -(100 + MAN_ADVANCE[row])
+            centre = KING_CENTRE[min(row, ROWS - 1 - row)] + KING_CENTRE[min(col, COLS - 1 - col)]
+            table["W"][sq] = 500 + centre
+            table["B"][sq] = -(500 + centre)
+    return table
+
+
+PIECE_SQUARE = _build_piece_square()
+
+
+def piece_square_score(grid):
+    score = 0
+    for row in range(ROWS):
+        for col in range(COLS):
+            piece = grid[row][col]
+            if piece != 0:
+                score += PIECE_SQUARE[piece][row * COLS + col]
+    return score
+
+
+KING_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+MAN_DIRECTIONS = {"w": ((-1, 0), (0, -1), (0, 1)), "b": ((1, 0), (0, -1), (0, 1))}
+ENEMIES = {"w": ("b", "B"), "b": ("w", "W")}
+
+
+def _build_move_tables():
+    king_rays = [[None] * COLS for _ in range(ROWS)]
+    man_steps = {color: [[None] * COLS for _ in range(ROWS)] for color in MAN_DIRECTIONS}
+    for row in range(ROWS):
+        for col in range(COLS):
+            rays = []
+            for dr, dc in KING_DIRECTIONS:
+                ray = []
+                r, c = row + dr, col + dc
+                while 0 <= r < ROWS and 0 <= c < COLS:
+                    ray.append((r, c))
+                    r, c = r + dr, c + dc
+                rays.append(tuple(ray))
+            king_rays[row][col] = tuple(rays)
+
+            for color, directions in MAN_DIRECTIONS.items():
+                steps = []
+                for dr, dc in directions:
+                    r, c = row + dr, col + dc
+                    if 0 <= r < ROWS and 0 <= c < COLS:
+                        landing = (r + dr, c + dc) if 0 <= r + dr < ROWS and 0 <= c + dc < COLS else None
+                        steps.append(((r, c), landing))
+                man_steps[color][row][col] = tuple(steps)
+    return king_rays, man_steps
+
+
+# KING_RAYS[row][col] lists the squares a king sees in each direction, nearest first;
+# MAN_STEPS[color][row][col] pairs each neighbour a man can step to with the square behind it.
+KING_RAYS, MAN_STEPS = _build_move_tables()
+
+# Capture sequences keyed by (Zobrist key, row, col); shared by every board in the process.
+CHAIN_CACHE = {}
+CHAIN_CACHE_SIZE = 200_000
+
+# Pre-rendered checkerboards, piece sprites and fonts for Board.draw, keyed by size.
+DRAW_CACHE = {}
+
+
+def _background(width, height, square_size):
+    key = ("background", width, height, square_size)
+    if key not in DRAW_CACHE:
+        import pygame
+
+        background = pygame.Surface((width, height))
+        background.fill(DARK_BROWN)
+        for row in range(ROWS):
+            for col in range(row % 2, COLS, 2):
+                pygame.draw.rect(background, LIGHT_BROWN,
+                                 (col * square_size, row * square_size, square_size, square_size))
+        DRAW_CACHE[key] = background
+    return DRAW_CACHE[key]
+
+
+def _piece_sprite(piece, square_size):
+    key = ("piece", piece, square_size)
+    if key not in DRAW_CACHE:
+        import pygame
+
+        sprite = pygame.Surface((square_size, square_size), pygame.SRCALPHA)
+        color = BLACK if piece.lower() == "b" else WHITE
+        center = (square_size // 2, square_size // 2)
+        pygame.draw.circle(sprite, color, center, square_size // 2 - 4)
+        if piece.isupper():
+            text_color = WHITE if color == BLACK else BLACK
+            text = cached_font(None, square_size // 2).render("K", True, text_color)
+            sprite.blit(text, (center[0] - text.get_width() // 2, center[1] - text.get_height() // 2))
+        DRAW_CACHE[key] = sprite
+    return DRAW_CACHE[key]
+
+
+def cached_font(name, size, bold=False):
+    key = ("font", name, size, bold)
+    if key not in DRAW_CACHE:
+        import pygame
+
+        DRAW_CACHE[key] = pygame.font.SysFont(name, size, bold=bold)
+    return DRAW_CACHE[key]
+
+
 class Board:
     def __init__(self):
         self.board = []
@@ -19,34 +150,28 @@ class Board:
                     self.board[row].append("w")
                 else:
                     self.board[row].append(0)
+        self.hash = zobrist_key(self.board)
+        self.score = piece_square_score(self.board)  # kept up to date by _put like the hash
+        # Squares occupied by each colour, kept up to date by _put so check_winner never scans the board.
+        self.pieces = {"w": set(), "b": set()}
+        for row in range(ROWS):
+            for col in range(COLS):
+                if self.board[row][col] != 0:
+                    self.pieces[self.board[row][col].lower()].add((row, col))
 
     def draw(self, surface, last_move=None):
+        import pygame  # imported here so headless runs never load pygame
+
         if last_move is None:
             last_move = self.last_move
         height, width = surface.get_height(), surface.get_width()
         square_size = min(width, height) // ROWS
 
-        surface.fill(DARK_BROWN)
-        for row in range(ROWS):
-            for col in range(row % 2, COLS, 2):
-                pygame.draw.rect(surface, LIGHT_BROWN,
-                                 (col * square_size, row * square_size, square_size, square_size))
-
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
+        surface.blit(_background(width, height, square_size), (0, 0))
+        for row, pieces in enumerate(self.board):
+            for col, piece in enumerate(pieces):
                 if piece != 0:
-                    color = BLACK if piece.lower() == "b" else WHITE
-                    center = (col * square_size + square_size // 2, row * square_size + square_size // 2)
-                    radius = square_size // 2 - 4
-                    pygame.draw.circle(surface, color, center, radius)
-
-                    if piece.isupper():
-                        font = pygame.font.SysFont(None, square_size // 2)
-                        text_color = WHITE if color == BLACK else BLACK
-                        text = font.render("K", True, text_color)
-                        surface.blit(text, (center[0] - text.get_width() // 2,
-                                            center[1] - text.get_height() // 2))
+                    surface.blit(_piece_sprite(piece, square_size), (col * square_size, row * square_size))
 
         if last_move:
             for move in last_move:
@@ -73,129 +198,198 @@ class Board:
 
     def get_valid_moves(self, row, col, only_captures=False):
         moves = []
-        piece = self.board[row][col]
+        board = self.board
+        piece = board[row][col]
         if piece == 0:
             return moves
 
         if piece.isupper():
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-            for dr, dc in directions:
+            enemies = ENEMIES[piece.lower()]
+            for ray in KING_RAYS[row][col]:
                 jumped = False
-                r, c = row + dr, col + dc
-                while self.is_within_bounds(r, c):
-                    target = self.board[r][c]
-                    if target == 0 and not jumped:
+                for r, c in ray:
+                    target = board[r][c]
+                    if target == 0:
+                        if jumped:
+                            moves.append((r, c))
+                            break
                         if not only_captures:
                             moves.append((r, c))
-                    elif target != 0 and target.lower() != piece.lower() and not jumped:
+                    elif target in enemies and not jumped:
                         jumped = True
-                    elif target == 0 and jumped:
-                        moves.append((r, c))
-                        break
                     else:
                         break
-                    r += dr
-                    c += dc
         else:
-            directions = [(-1, 0), (0, -1), (0, 1)] if piece == "w" else [(1, 0), (0, -1), (0, 1)]
-            for dr, dc in directions:
-                new_row, new_col = row + dr, col + dc
-                if self.is_within_bounds(new_row, new_col):
-                    target = self.board[new_row][new_col]
-                    if target == 0 and not only_captures:
-                        moves.append((new_row, new_col))
-                    elif target != 0 and target.lower() != piece.lower():
-                        jump_row, jump_col = new_row + dr, new_col + dc
-                        if self.is_within_bounds(jump_row, jump_col) and self.board[jump_row][jump_col] == 0:
-                            moves.append((jump_row, jump_col))
+            enemies = ENEMIES[piece]
+            for (r, c), landing in MAN_STEPS[piece][row][col]:
+                target = board[r][c]
+                if target == 0:
+                    if not only_captures:
+                        moves.append((r, c))
+                elif target in enemies and landing is not None and board[landing[0]][landing[1]] == 0:
+                    moves.append(landing)
         return moves
 
     def get_all_moves(self, color):
+        """Legal moves as square paths: (start, end) for a step or slide, and the
+        complete landing sequence (start, l1, l2, ...) for a capture."""
         all_moves = []
         must_jump = []
 
         for row in range(ROWS):
             for col in range(COLS):
                 if self.board[row][col] != 0 and self.board[row][col].lower() == color:
-                    captures = self.get_valid_moves(row, col, only_captures=True)
-                    if captures:
-                        for move in captures:
-                            must_jump.append(((row, col), move))
-                    else:
+                    chains = self.capture_chains(row, col)
+                    if chains:
+                        for chain in chains:
+                            must_jump.append(((row, col),) + chain)
+                    elif not must_jump:
                         moves = self.get_valid_moves(row, col)
                         for move in moves:
                             all_moves.append(((row, col), move))
 
         return must_jump if must_jump else all_moves
 
-    def move_piece(self, start, end):
-        self.last_move = []  # Her hamle başında sıfırla
+    def capture_chains(self, row, col):
+        """Every complete capture sequence for the piece on (row, col), as tuples of landing squares.
+
+        Results are memoised in CHAIN_CACHE by Zobrist key, so a chain reached again, from
+        another capture order or a later search, is never expanded twice.
+        """
+        jumps = self.get_valid_moves(row, col, only_captures=True)
+        if not jumps:
+            return ()
+        key = (self.hash, row, col)
+        chains = CHAIN_CACHE.get(key)
+        if chains is not None:
+            return chains
+
+        chains = []
+        for landing in jumps:
+            step = self._step((row, col), landing)
+            continuations = self.capture_chains(*landing)
+            self._unstep(step)
+            if continuations:
+                chains.extend((landing,) + rest for rest in continuations)
+            else:
+                chains.append((landing,))
+        chains = tuple(chains)
+
+        if len(CHAIN_CACHE) >= CHAIN_CACHE_SIZE:
+            CHAIN_CACHE.clear()
+        CHAIN_CACHE[key] = chains
+        return chains
+
+    def move_piece(self, start, *path):
+        jumped, end, _ = self._move(start, path)
+        return jumped, end
+
+    def make_move(self, start, *path):
+        piece = self._get(*start)
+        last_move = self.last_move
+        key = self.hash
+        _, end, captured = self._move(start, path)
+        return start, piece, end, captured, last_move, key
+
+    def unmake_move(self, undo):
+        start, piece, end, captured, last_move, key = undo
+        self._put(end[0], end[1], 0)
+        self._put(start[0], start[1], piece)
+        for (r, c), captured_piece in captured:
+            self._put(r, c, captured_piece)
+        self.last_move = last_move
+        self.hash = key
+
+    def _get(self, row, col):
+        return self.board[row][col]
+
+    def _put(self, row, col, piece):
+        old = self.board[row][col]
+        if old != 0:
+            self.hash ^= ZOBRIST[old][row * COLS + col]
+            self.score -= PIECE_SQUARE[old][row * COLS + col]
+            self.pieces[old.lower()].discard((row, col))
+        if piece != 0:
+            self.hash ^= ZOBRIST[piece][row * COLS + col]
+            self.score += PIECE_SQUARE[piece][row * COLS + col]
+            self.pieces[piece.lower()].add((row, col))
+        self.board[row][col] = piece
+
+    def _step(self, start, end):
+        """Move one piece from start to end, capturing the first enemy in between and promoting."""
         sr, sc = start
         er, ec = end
-        piece = self.board[sr][sc]
-        self.board[sr][sc] = 0
-        self.board[er][ec] = piece
-        self.last_move.append(((sr, sc), (er, ec)))
-
-        jumped = False
-        if abs(er - sr) > 1 or abs(ec - sc) > 1:
-            jumped = True
-            dr = (er - sr) // max(1, abs(er - sr)) if er != sr else 0
-            dc = (ec - sc) // max(1, abs(ec - sc)) if ec != sc else 0
-            r, c = sr + dr, sc + dc
-            while r != er or c != ec:
-                if self.board[r][c] != 0 and self.board[r][c].lower() != piece.lower():
-                    self.board[r][c] = 0
-                    break
-                r += dr
-                c += dc
+        piece = self._get(sr, sc)
+        captured = None
+        dr = (er > sr) - (er < sr)
+        dc = (ec > sc) - (ec < sc)
+        enemies = ENEMIES[piece.lower()]
+        r, c = sr + dr, sc + dc
+        while r != er or c != ec:
+            target = self._get(r, c)
+            if target in enemies:
+                captured = ((r, c), target)
+                self._put(r, c, 0)
+                break
+            r += dr
+            c += dc
 
+        self._put(sr, sc, 0)
         if piece == "w" and er == 0:
-            self.board[er][ec] = "W"
-        elif piece == "b" and er == 7:
-            self.board[er][ec] = "B"
+            self._put(er, ec, "W")
+        elif piece == "b" and er == ROWS - 1:
+            self._put(er, ec, "B")
+        else:
+            self._put(er, ec, piece)
+        return start, end, piece, captured
+
+    def _unstep(self, step):
+        start, end, piece, captured = step
+        self._put(end[0], end[1], 0)
+        self._put(start[0], start[1], piece)
+        if captured is not None:
+            self._put(captured[0][0], captured[0][1], captured[1])
+
+    def _move(self, start, path):
+        self.last_move = []  # Her hamle başında sıfırla
+        captured = []
+        square = start
+        step_captured = None
+        for target in path:
+            _, _, _, step_captured = self._step(square, target)
+            if step_captured is not None:
+                captured.append(step_captured)
+            self.last_move.append((square, target))
+            square = target
 
-        while jumped:
-            more_jumps = self.get_valid_moves(er, ec, only_captures=True)
+        # A capture given without its continuation (the old two-square form) is finished greedily.
+        while step_captured is not None:
+            more_jumps = self.get_valid_moves(square[0], square[1], only_captures=True)
             if not more_jumps:
                 break
+            _, _, _, step_captured = self._step(square, more_jumps[0])
+            captured.append(step_captured)
+            self.last_move.append((square, more_jumps[0]))
+            square = more_jumps[0]
 
-            next_r, next_c = more_jumps[0]
-            sr, sc = er, ec
-            er, ec = next_r, next_c
-            self.board[sr][sc] = 0
-            self.board[er][ec] = piece
-            self.last_move.append(((sr, sc), (er, ec)))
-            dr = (er - sr) // max(1, abs(er - sr)) if er != sr else 0
-            dc = (ec - sc) // max(1, abs(ec - sc)) if ec != sc else 0
-            r, c = sr + dr, sc + dc
-            while r != er or c != ec:
-                if self.board[r][c] != 0 and self.board[r][c].lower() != piece.lower():
-                    self.board[r][c] = 0
-                    break
-                r += dr
-                c += dc
-            if piece == "w" and er == 0:
-                self.board[er][ec] = "W"
-            elif piece == "b" and er == 7:
-                self.board[er][ec] = "B"
-
-        return jumped, (er, ec)
+        return bool(captured), square, captured
 
-    def check_winner(self):
-        whites = [p for row in self.board for p in row if p != 0 and p.lower() == 'w']
-        blacks = [p for row in self.board for p in row if p != 0 and p.lower() == 'b']
-
-        white_moves = any(self.get_valid_moves(row, col)
-                          for row in range(ROWS) for col in range(COLS)
-                          if self.board[row][col] != 0 and self.board[row][col].lower() == 'w')
-        black_moves = any(self.get_valid_moves(row, col)
-                          for row in range(ROWS) for col in range(COLS)
-                          if self.board[row][col] != 0 and self.board[row][col].lower() == 'b')
+    def has_moves(self, color):
+        for row, col in self.pieces[color]:
+            if self.get_valid_moves(row, col):
+                return True
+        return False
 
-        if not whites or not white_moves:
+    def check_winner(self):
+        if not self.pieces["w"] or not self.has_moves("w"):
             return "b"
-        if not blacks or not black_moves:
+        if not self.pieces["b"] or not self.has_moves("b"):
             return "w"
 
-        return None
\ No newline at end of file
+        return None
+
+def new_board():
+    if USE_BITBOARD:
+        from bitboard import BitBoard
+        return BitBoard()
+    return Board()
@@ -3,6 +3,9 @@ ROWS, COLS = 8, 8
 SQUARE_SIZE = WIDTH // COLS
 FPS = 60
 MOVE_DELAY = 0.3
+USE_BITBOARD = True
+TABLEBASE_PATH = "endgame.tb"  # written by tablebase.py; agents use it when the file exists
+POSITION_CACHE_SIZE = 100_000  # positions kept by a PositionCache, when one is enabled
 
 WHITE = (255, 255, 255)
 GREY = (128, 128, 128)
@@ -0,0 +1,222 @@
+import argparse
+import itertools
+import json
+import os
+import struct
+import time
+from constants import *
+
+# A record file is a sequence of small records, each a kind byte and the id of the game it belongs to.
+# A game begins with its first turn and metadata as JSON, gains one record per move as it is played and
+# ends with its result, so games played side by side share a file and a crash loses at most the move
+# being written. A move is one byte holding the number of squares in its path, then one byte
+# (row * 8 + col) per square, so a plain step costs three bytes after its record header.
+RECORD = struct.Struct("<BH")  # kind, game id
+BEGIN = struct.Struct("<4sBH")  # magic, first turn, metadata bytes
+END = struct.Struct("<BfH")  # result, seconds, plies
+BEGIN_KIND, MOVE_KIND, END_KIND = 1, 2, 3
+MAGIC = b"ACGR"
+TURNS = ("w", "b")
+RESULTS = ("w", "b", "draw", "unfinished")
+
+
+def encode_moves(moves):
+    data = bytearray()
+    for path in moves:
+        data.append(len(path))
+        data.extend(row * 8 + col for row, col in path)
+    return bytes(data)
+
+
+def decode_moves(data):
+    moves = []
+    i = 0
+    while i < len(data):
+        length = data[i]
+        moves.append(tuple(divmod(sq, 8) for sq in data[i + 1:i + 1 + length]))
+        i += 1 + length
+    return moves
+
+
+def _records(f, path):
+    """Yield (kind, game id, payload, end offset) for each complete record; stops at one cut off mid-write."""
+    while True:
+        start = f.tell()
+        head = f.read(RECORD.size)
+        if len(head) < RECORD.size:
+            return
+        kind, game = RECORD.unpack(head)
+        if kind == BEGIN_KIND:
+            fixed = f.read(BEGIN.size)
+            if len(fixed) < BEGIN.size:
+                return
+            magic, first_turn, meta_size = BEGIN.unpack(fixed)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: corrupt game record at byte {start}")
+            meta = f.read(meta_size)
+            if len(meta) < meta_size:
+                return
+            payload = (TURNS[first_turn], meta)
+        elif kind == MOVE_KIND:
+            length = f.read(1)
+            if not length:
+                return
+            squares = f.read(length[0])
+            if len(squares) < length[0]:
+                return
+            payload = length + squares
+        elif kind == END_KIND:
+            fixed = f.read(END.size)
+            if len(fixed) < END.size:
+                return
+            payload = END.unpack(fixed)
+        else:
+            raise ValueError(f"{path}: corrupt game record at byte {start}")
+        yield kind, game, payload, f.tell()
+
+
+class GameRecordWriter:
+    """Streams games to a record file; every record is flushed as soon as it is written."""
+
+    def __init__(self, path):
+        end = 0
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for *_, end in _records(f, path):
+                    pass
+        self.file = open(path, "ab")
+        self.file.truncate(end)  # drop a record a crashed run left half written, so ours line up after it
+        self.plies = {}  # moves written so far by each game that has begun but not ended
+
+    def _write(self, kind, game, data):
+        self.file.write(RECORD.pack(kind, game) + data)
+        self.file.flush()
+
+    def begin_game(self, first_turn, meta=None):
+        """Start a game; returns the id to pass to append_move and end_game. `meta` holds agents and parameters."""
+        game = next(i for i in itertools.count() if i not in self.plies)
+        meta_bytes = json.dumps(meta or {}, separators=(",", ":")).encode()
+        self._write(BEGIN_KIND, game, BEGIN.pack(MAGIC, TURNS.index(first_turn), len(meta_bytes)) + meta_bytes)
+        self.plies[game] = 0
+        return game
+
+    def append_move(self, game, move):
+        self._write(MOVE_KIND, game, encode_moves([move]))
+        self.plies[game] += 1
+
+    def end_game(self, game, result, seconds=0.0):
+        """`result` is "w", "b", "draw" or "unfinished"."""
+        self._write(END_KIND, game, END.pack(RESULTS.index(result), seconds, self.plies.pop(game)))
+
+    def write_game(self, moves, first_turn, result, seconds=0.0, meta=None):
+        """Record a game that has already been played."""
+        game = self.begin_game(first_turn, meta)
+        for move in moves:
+            self.append_move(game, move)
+        self.end_game(game, result, seconds)
+
+    def close(self):
+        self.file.close()
+
+
+def _game(state, result, seconds, decode):
+    return {"first_turn": state["first_turn"], "result": result, "seconds": seconds, "plies": state["plies"],
+            "meta": json.loads(state["meta"]),
+            "moves": decode_moves(state["moves"]) if decode else bytes(state["moves"])}
+
+
+def read_games(path, decode=True):
+    """Yield every game in the file as a dict in the order they ended; with decode=False the moves stay packed bytes.
+
+    Games that never ended, because they are still being played or their run was killed, are reported
+    as "unfinished" with `seconds` None once the file shows they cannot continue, or at its end.
+    """
+    playing = {}
+    with open(path, "rb") as f:
+        for kind, game, payload, _ in _records(f, path):
+            if kind == BEGIN_KIND:
+                if game in playing:  # the run that began it stopped before ending it
+                    yield _game(playing.pop(game), "unfinished", None, decode)
+                first_turn, meta = payload
+                playing[game] = {"first_turn": first_turn, "meta": meta, "moves": bytearray(), "plies": 0}
+            elif game not in playing:
+                raise ValueError(f"{path}: record for game {game}, which has not begun")
+            elif kind == MOVE_KIND:
+                playing[game]["moves"] += payload
+                playing[game]["plies"] += 1
+            else:
+                result, seconds, plies = payload
+                if plies != playing[game]["plies"]:
+                    raise ValueError(f"{path}: game {game} ended after {plies} plies but has "
+                                     f"{playing[game]['plies']}")
+                yield _game(playing.pop(game), RESULTS[result], seconds, decode)
+    for state in playing.values():
+        yield _game(state, "unfinished", None, decode)
+
+
+def replay(path, index, delay=0.5):
+    """Draw game `index` of a record file move by move with Board.draw; no agent runs.
+
+    Space pauses, the arrow keys step back and forth, Escape quits.
+    """
+    import pygame
+    from board import new_board
+
+    game = next((g for i, g in enumerate(read_games(path)) if i == index), None)
+    if game is None:
+        raise SystemExit(f"{path} has no game {index}")
+
+    # Positions are rebuilt from the start, so stepping back is just replaying one move fewer.
+    def position(ply):
+        board = new_board()
+        for move in game["moves"][:ply]:
+            board.move_piece(*move)
+        return board
+
+    pygame.init()
+    win = pygame.display.set_mode((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+    ply, paused, last_step, shown = 0, False, time.time(), None
+    total = len(game["moves"])
+    while True:
+        clock.tick(FPS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    ply, paused = min(total, ply + 1), True
+                elif event.key == pygame.K_LEFT:
+                    ply, paused = max(0, ply - 1), True
+        if not paused and ply < total and time.time() - last_step >= delay:
+            ply += 1
+            last_step = time.time()
+        if ply != shown:
+            board = position(ply)
+            board.draw(win)
+            pygame.display.set_caption(f"Replay {index}: ply {ply}/{total}, result {game['result']}")
+            pygame.display.update()
+            shown = ply
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or replay games from a binary record file.")
+    parser.add_argument("path")
+    parser.add_argument("--game", type=int, help="replay this game (0-based) instead of listing")
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds between replayed moves")
+    args = parser.parse_args()
+
+    if args.game is not None:
+        replay(args.path, args.game, args.delay)
+        return
+    for i, game in enumerate(read_games(args.path, decode=False)):
+        seconds = "?" if game["seconds"] is None else f"{game['seconds']:.1f}s"
+        print(f"{i}: {game['result']:10} {game['plies']:4} plies {seconds:>8} "
+              f"first {game['first_turn']} {json.dumps(game['meta'])}")
+
+
+if __name__ == "__main__":
+    main()
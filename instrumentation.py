@@ -0,0 +1,50 @@
+import csv
+import json
+
+# Columns of the CSV export; JSONL rows keep whatever counters the agent reported.
+FIELDS = ["game", "ply", "color", "agent", "elapsed", "nodes", "simulations", "depth", "cutoffs", "tt_hits",
+          "tree_nodes", "root_visits", "mean_rollout_plies", "max_rollout_plies", "rollout_seconds",
+          "cache_hits", "cache_misses"]
+
+
+class StatsLog:
+    """Appends one row of search statistics per move, as CSV when `path` ends in .csv, else JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.endswith(".csv")
+        self.file = open(path, "a", newline="")
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, FIELDS, extrasaction="ignore")
+            if self.file.tell() == 0:
+                self.writer.writeheader()
+
+    def write(self, **row):
+        if self.is_csv:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def format_stats(stats):
+    """One short overlay line: depth/nodes for a search, simulations for MCTS, and time."""
+    parts = []
+    if stats.get("depth"):
+        parts.append(f"d{stats['depth']}")
+    if stats.get("nodes"):
+        parts.append(f"{stats['nodes'] / 1000:.1f}k nodes")
+    if stats.get("simulations"):
+        parts.append(f"{stats['simulations']} sims")
+    if stats.get("tree_nodes"):
+        parts.append(f"tree {stats['tree_nodes']}")
+    if stats.get("cutoffs"):
+        parts.append(f"{stats['cutoffs']} cuts")
+    lookups = stats.get("cache_hits", 0) + stats.get("cache_misses", 0)
+    if lookups:
+        parts.append(f"cache {stats['cache_hits'] / lookups:.0%}")
+    parts.append(f"{stats.get('elapsed', 0.0):.2f}s")
+    return " ".join(parts)
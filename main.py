@@ -1,101 +1,209 @@
-import pygame
+import argparse
+import functools
+import json
 import random
 import time
-from menu import show_ai_menu
 from constants import *
-from board import Board
-from agents.abp import ABPPlayer
-from agents.mcts import MCTSPlayer
-from agents.random import RandomPlayer
+from board import new_board, cached_font
+from players import create_player
+from agent_worker import AgentWorker
+from instrumentation import StatsLog, format_stats
+from game_record import GameRecordWriter
+from position_cache import PositionCache
 
 ROWS, COLS = 1, 1
 SUB_WIDTH = WIDTH // COLS
 SUB_HEIGHT = HEIGHT // ROWS
+OVERLAY = None
 
 
 class GameInstance:
-    def __init__(self, x_idx, y_idx, white_player, black_player):
+    def __init__(self, x_idx, y_idx, white_player, black_player, move_times=None, stats_log=None,
+                 show_stats=False, recorder=None, meta=None):
         self.x_idx = x_idx
         self.y_idx = y_idx
         self.white_player = white_player
         self.black_player = black_player
+        self.move_times = move_times or {}  # seconds each colour may think per move; missing means no limit
+        self.stats_log = stats_log  # StatsLog receiving every move's search statistics, or None
+        self.show_stats = show_stats
+        self.recorder = recorder  # GameRecordWriter receiving every move as it is played, or None
+        self.meta = meta or {}
+        self.worker = AgentWorker(white_player, black_player)
+        import pygame  # imported here, like every pygame use in this file, so headless runs never load it
+
+        self.surface = pygame.Surface((SUB_WIDTH, SUB_HEIGHT))
+        self.rect = self.surface.get_rect(topleft=(x_idx * SUB_WIDTH, y_idx * SUB_HEIGHT))
         self.reset()
 
     def reset(self):
-        self.board = Board()
+        self.board = new_board()
         self.current_turn = random.choice(["w", "b"])
+        self.first_turn = self.current_turn
+        if self.recorder is not None:
+            self.record_id = self.recorder.begin_game(self.first_turn, self.meta)
         self.finished = False
         self.winner = None
         self.start_time = time.time()
         self.last_move = []
         self.last_move_time = 0
+        self.ready = False  # a move has arrived from the worker and waits for MOVE_DELAY
+        self.next_move = None
+        self.worker.cancel()
+        self.ply = 0
+        self.stats = {"w": None, "b": None}  # search statistics of each side's last move
+        self.dirty = True  # the position changed since this game was last drawn
 
     def update(self):
         if self.finished:
             return
-        
+
+        # The players think in the worker process; this only starts a search or collects its move.
+        if not self.ready:
+            if not self.worker.pending:
+                self.worker.request(self.board, self.current_turn, self.move_times.get(self.current_turn))
+            self.ready, self.next_move = self.worker.poll()
+            if not self.ready:
+                return
+
         now = time.time()
         if now - self.last_move_time < MOVE_DELAY:
             return
 
-        move = None
-        if self.current_turn == "w":
-            move = self.white_player.get_move(self.board)
-        else:
-            move = self.black_player.get_move(self.board)
-
+        move, self.ready, self.next_move = self.next_move, False, None
+        self.record_stats()
         if move:
             jumped, _ = self.board.move_piece(*move)
+            if self.recorder is not None:
+                self.recorder.append_move(self.record_id, move)
             self.last_move = self.board.last_move
             self.current_turn = "b" if self.current_turn == "w" else "w"
             self.last_move_time = time.time()
+            self.ply += 1
         else:
             self.finished = True
             self.winner = "Black" if self.current_turn == "w" else "White"
+            self.save_record("b" if self.current_turn == "w" else "w")
+        self.dirty = True
+
+    def save_record(self, result):
+        if self.recorder is not None:
+            self.recorder.end_game(self.record_id, result, time.time() - self.start_time)
+
+    def record_stats(self):
+        stats = self.worker.stats
+        self.stats[self.current_turn] = stats
+        if self.stats_log is not None:
+            player = self.white_player if self.current_turn == "w" else self.black_player
+            self.stats_log.write(game=self.y_idx * COLS + self.x_idx, ply=self.ply, color=self.current_turn,
+                                 agent=type(player).__name__, **stats)
 
     def draw(self, win):
-        surface = pygame.Surface((SUB_WIDTH, SUB_HEIGHT))
+        """Repaint this game's area if its position changed; returns the rect to update, else None."""
+        import pygame
+
+        if not self.dirty:
+            return None
+        self.dirty = False
+        surface = self.surface
         self.board.draw(surface, last_move=self.last_move)
 
         if self.finished:
-            overlay = pygame.Surface((SUB_WIDTH, SUB_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 150))
-            surface.blit(overlay, (0, 0))
-
-            font = pygame.font.SysFont("arial", 24, bold=True)
+            surface.blit(finished_overlay(), (0, 0))
+            font = cached_font("arial", 24, bold=True)
             text = font.render(f"{self.winner} wins!", True, (255, 255, 255))
             text_rect = text.get_rect(center=(SUB_WIDTH // 2, SUB_HEIGHT // 2))
             surface.blit(text, text_rect)
-        
-        font = pygame.font.SysFont("arial", 20)
+
+        font = cached_font("arial", 20)
         turn_text = font.render(f"Turn: {'White' if self.current_turn == 'w' else 'Black'}", True, (255, 255, 255))
         surface.blit(turn_text, (10, 10))
-        
+
+        if self.show_stats:
+            font = cached_font("arial", 14)
+            y = 10 + turn_text.get_height()
+            for color, name in (("w", "White"), ("b", "Black")):
+                if self.stats[color]:
+                    line = font.render(f"{name}: {format_stats(self.stats[color])}", True, (255, 255, 0))
+                    surface.blit(line, (10, y))
+                    y += line.get_height()
+
         pygame.draw.rect(surface, (200, 200, 200), surface.get_rect(), 2)
-        win.blit(surface, (self.x_idx * SUB_WIDTH, self.y_idx * SUB_HEIGHT))
-
-def create_player(alg, color, abp_depth, mcts_sims):
-    if alg == "ABP":
-        return ABPPlayer(color, depth=abp_depth)
-    elif alg == "MCTS":
-        return MCTSPlayer(color, simulations=mcts_sims)
-    elif alg == "Random":
-        return RandomPlayer(color)
-    else:
-        raise ValueError(f"Unknown algorithm {alg}")
+        win.blit(surface, self.rect)
+        return self.rect
+
+
+def finished_overlay():
+    import pygame
+
+    global OVERLAY
+    if OVERLAY is None or OVERLAY.get_size() != (SUB_WIDTH, SUB_HEIGHT):
+        OVERLAY = pygame.Surface((SUB_WIDTH, SUB_HEIGHT), pygame.SRCALPHA)
+        OVERLAY.fill((0, 0, 0, 150))
+    return OVERLAY
 
-def main():
-    params = show_ai_menu()
-    white_alg = params["white_alg"]
-    black_alg = params["black_alg"]
 
-    white_abp_depth = params.get("white_abp_depth", 3)
-    black_abp_depth = params.get("black_abp_depth", 3)
+def player_settings(params, side):
+    """create_player arguments for "white" or "black" from the menu's parameters."""
+    return {"alg": params.get(f"{side}_alg", "ABP" if side == "white" else "MCTS"),
+            "abp_depth": params.get(f"{side}_abp_depth", 3),
+            "mcts_sims": params.get(f"{side}_mcts_sims", 500),
+            "mcts_workers": params.get(f"{side}_mcts_workers", 1),
+            "mcts_batch": params.get(f"{side}_mcts_batch", 1),
+            "abp_time": params.get(f"{side}_abp_time") or None,
+            "abp_workers": params.get(f"{side}_abp_workers", 1)}
 
-    white_mcts_sims = params.get("white_mcts_sims", 500)
-    black_mcts_sims = params.get("black_mcts_sims", 500)
 
-    num_games = params["num_games"]
+def game_settings(params):
+    white, black = player_settings(params, "white"), player_settings(params, "black")
+    # 0 keeps the depth or simulation settings; otherwise every move must be played within this many seconds.
+    move_times = {"w": params.get("white_move_time", 0) or None, "b": params.get("black_move_time", 0) or None}
+    meta = {"white": dict(white, move_time=move_times["w"]), "black": dict(black, move_time=move_times["b"])}
+    return white, black, move_times, meta
+
+
+def run_headless(params):
+    """Play the configured games one after another in this process, printing each result."""
+    from tournament import DEFAULT_MAX_PLIES, play_game
+
+    white, black, move_times, meta = game_settings(params)
+    record_file = params.get("record_file", "")
+    recorder = GameRecordWriter(record_file) if record_file else None
+    for i in range(params.get("num_games", 1)):
+        position_cache = PositionCache() if params.get("position_cache", False) else None
+        white_player = create_player(color="w", position_cache=position_cache, **white)
+        black_player = create_player(color="b", position_cache=position_cache, **black)
+        first_turn = random.choice(["w", "b"])
+        on_move = None
+        if recorder is not None:
+            record_id = recorder.begin_game(first_turn, meta)
+            on_move = functools.partial(recorder.append_move, record_id)
+        start = time.time()
+        winner, plies, _ = play_game(white_player, black_player, first_turn,
+                                     params.get("max_plies", DEFAULT_MAX_PLIES), move_times, on_move=on_move)
+        if recorder is not None:
+            recorder.end_game(record_id, winner or "draw", time.time() - start)
+        result = {"w": "White wins", "b": "Black wins", None: "Draw"}[winner]
+        print(f"Game {i + 1}: {result} after {plies} plies ({time.time() - start:.1f}s)")
+        for player in (white_player, black_player):
+            if hasattr(player, "close"):
+                player.close()
+    if recorder is not None:
+        recorder.close()
+
+
+def run_window(params):
+    import pygame
+
+    white, black, move_times, meta = game_settings(params)
+    num_games = params.get("num_games", 1)
+
+    show_stats = params.get("show_stats", False)
+    use_position_cache = params.get("position_cache", False)
+    stats_file = params.get("stats_file", "")
+    stats_log = StatsLog(stats_file) if stats_file else None
+    record_file = params.get("record_file", "")
+    recorder = GameRecordWriter(record_file) if record_file else None
 
     global ROWS, COLS, SUB_WIDTH, SUB_HEIGHT
     ROWS = COLS = int(num_games ** 0.5) + (0 if int(num_games ** 0.5) ** 2 == num_games else 1)
@@ -111,11 +219,18 @@ def main():
     for i in range(num_games):
         x = i % COLS
         y = i // COLS
-        white_player = create_player(white_alg, "w", white_abp_depth, white_mcts_sims)
-        black_player = create_player(black_alg, "b", black_abp_depth, black_mcts_sims)
-        game = GameInstance(x, y, white_player, black_player)
+        # Both players of a game run in its worker process, so they share one cache there.
+        position_cache = PositionCache() if use_position_cache else None
+        white_player = create_player(color="w", position_cache=position_cache, **white)
+        black_player = create_player(color="b", position_cache=position_cache, **black)
+        # Detailed counters cost a little search time, so they are only collected when someone reads them.
+        white_player.instrumented = black_player.instrumented = show_stats or stats_log is not None
+        game = GameInstance(x, y, white_player, black_player, move_times, stats_log, show_stats,
+                            recorder, meta)
         games.append(game)
 
+    WIN.fill((0, 0, 0))
+    pygame.display.update()
     run = True
     while run:
         clock.tick(FPS)
@@ -123,27 +238,79 @@ def main():
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
+            elif event.type == pygame.WINDOWEXPOSED:
+                for game in games:
+                    game.dirty = True
 
         all_finished = True
-        WIN.fill((0, 0, 0))
+        dirty_rects = []
 
         for game in games:
             if not game.finished and (time.time() - game.start_time > 90):
+                game.save_record("unfinished")  # keep the abandoned game before starting over
                 game.reset()
 
             game.update()
-            game.draw(WIN)
+            rect = game.draw(WIN)
+            if rect is not None:
+                dirty_rects.append(rect)
 
             if not game.finished:
                 all_finished = False
 
-        pygame.display.update()
+        # Only boards whose position changed are pushed to the screen.
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
 
         if all_finished:
             pygame.time.wait(1000)
             run = False
 
+    for game in games:
+        if not game.finished:
+            game.save_record("unfinished")
+        game.worker.close()
+    if stats_log is not None:
+        stats_log.close()
+    if recorder is not None:
+        recorder.close()
     pygame.quit()
 
+
+def load_params(args):
+    params = {}
+    if args.config:
+        with open(args.config) as f:
+            params.update(json.load(f))
+    for item in args.set:
+        key, _, value = item.partition("=")
+        try:
+            params[key] = json.loads(value)
+        except json.JSONDecodeError:
+            params[key] = value  # plain strings such as file names need no quotes
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch AI players play checkers, or run them without a window.")
+    parser.add_argument("--config", help="JSON file of the menu's parameters (white_alg, num_games...); "
+                                         "skips the menu")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="set one parameter, e.g. --set white_abp_depth=4; skips the menu")
+    parser.add_argument("--headless", action="store_true", help="play in the terminal without pygame")
+    args = parser.parse_args()
+
+    if args.config or args.set or args.headless:
+        params = load_params(args)
+    else:
+        from menu import show_ai_menu
+
+        params = show_ai_menu()
+    if args.headless:
+        run_headless(params)
+    else:
+        run_window(params)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import time
+from tournament import DEFAULT_MAX_PLIES, run_game, add_player_arguments, config_from_args
+
+SCORES = {"win": 1.0, "draw": 0.5, "loss": 0.0}
+# Lower bound on the variance of a pair's score. Without it a match where every pair ends alike has
+# no variance and the test could never decide; unlike extra samples, it leaves the mean unbiased.
+VARIANCE_FLOOR = 0.01
+
+
+def expected_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+class SPRT:
+    """Sequential probability ratio test of H0: elo = elo0 against H1: elo = elo1 for config A.
+
+    Each colour-swapped pair of games is one sample, its mean score, which cancels most of the
+    first-move and colour advantage. The log-likelihood ratio uses the usual normal approximation.
+    """
+
+    def __init__(self, elo0=0.0, elo1=20.0, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.pairs = []
+
+    def add_pair(self, score):
+        self.pairs.append(score)
+
+    def mean_variance(self):
+        samples = self.pairs
+        mean = sum(samples) / len(samples)
+        return mean, max(sum((x - mean) ** 2 for x in samples) / len(samples), VARIANCE_FLOOR)
+
+    def llr(self):
+        if not self.pairs:
+            return 0.0
+        mean, variance = self.mean_variance()
+        s0, s1 = expected_score(self.elo0), expected_score(self.elo1)
+        return len(self.pairs) * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+    def status(self):
+        """Return "H1" once A is shown to be at least elo1 stronger, "H0" once at most elo0, else None."""
+        llr = self.llr()
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
+
+    def elo(self):
+        """Elo difference of A over B with a 95% confidence interval, as (elo, low, high)."""
+        if not self.pairs:
+            return 0.0, -math.inf, math.inf
+        mean, variance = self.mean_variance()
+        margin = 1.96 * math.sqrt(variance / len(self.pairs))
+        return elo_from_score(mean), elo_from_score(mean - margin), elo_from_score(mean + margin)
+
+
+def pair_jobs(config_a, config_b, max_pairs, seed, max_plies):
+    # Both games of a pair share a seed and a starting side; only the colours change hands.
+    for pair in range(max_pairs):
+        first_turn = "w" if pair % 2 == 0 else "b"
+        for a_is_white in (True, False):
+            yield (2 * pair + (not a_is_white), config_a, config_b, a_is_white, seed + pair, max_plies, False,
+                   first_turn)
+
+
+def run_match(config_a, config_b, output, sprt, max_games=2000, workers=None, seed=0,
+              max_plies=DEFAULT_MAX_PLIES, progress=True):
+    """Play colour-swapped pairs until the SPRT decides or `max_games` are played.
+
+    Every game is appended to `output` as it finishes. Returns the summary.
+    """
+    workers = workers or os.cpu_count() or 1
+    counts = {"win": 0, "draw": 0, "loss": 0}
+    halves = {}
+    decision = None
+    start = time.perf_counter()
+
+    with open(output, "a") as out, multiprocessing.Pool(workers) as pool:
+        games = pool.imap_unordered(run_game, pair_jobs(config_a, config_b, max_games // 2, seed, max_plies))
+        for record in games:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            counts[record["result"]] += 1
+            pair = record["game"] // 2
+            if pair not in halves:
+                halves[pair] = record
+                continue
+            sprt.add_pair((SCORES[halves.pop(pair)["result"]] + SCORES[record["result"]]) / 2)
+            decision = sprt.status()
+            if progress:
+                elo, low, high = sprt.elo()
+                print(f"{2 * len(sprt.pairs)} games, W/D/L {counts['win']}/{counts['draw']}/{counts['loss']}, "
+                      f"elo {elo:+.1f} [{low:+.1f}, {high:+.1f}], LLR {sprt.llr():.2f} "
+                      f"({sprt.lower:.2f}, {sprt.upper:.2f})")
+            if decision is not None:
+                break  # leaving the pool terminates the games still running
+
+    elo, low, high = sprt.elo()
+    return {
+        "decision": decision,
+        "games": 2 * len(sprt.pairs),
+        "seconds": time.perf_counter() - start,
+        "wins": counts["win"],
+        "draws": counts["draw"],
+        "losses": counts["loss"],
+        "elo": elo,
+        "elo_low": low,
+        "elo_high": high,
+        "llr": sprt.llr(),
+        "elo0": sprt.elo0,
+        "elo1": sprt.elo1,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two agent configurations with an SPRT, stopping as soon "
+                                                 "as the result is significant.")
+    add_player_arguments(parser, "a")
+    add_player_arguments(parser, "b")
+    parser.add_argument("--elo0", type=float, default=0.0, help="H0: A is at most this much stronger")
+    parser.add_argument("--elo1", type=float, default=20.0, help="H1: A is at least this much stronger")
+    parser.add_argument("--alpha", type=float, default=0.05, help="false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="false negative rate")
+    parser.add_argument("--max-games", type=int, default=2000, help="stop undecided after this many games")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to all cores")
+    parser.add_argument("--output", default="match.jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES)
+    args = parser.parse_args()
+
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+    summary = run_match(config_from_args(args, "a"), config_from_args(args, "b"), args.output, sprt,
+                        args.max_games, args.workers, args.seed, args.max_plies)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,19 @@
-import dearpygui.dearpygui as dpg
+import os
 
 def get_screen_size():
     try:
         import tkinter as tk
         root = tk.Tk()
         root.withdraw()
-        return root.winfo_screenwidth(), root.winfo_screenheight()
+        size = root.winfo_screenwidth(), root.winfo_screenheight()
+        root.destroy()
+        return size
     except Exception:
         return 800, 800
 
 def show_ai_menu():
+    import dearpygui.dearpygui as dpg  # only loaded when the menu is actually shown
+
     dpg.create_context()
 
     menu_width = 800
@@ -25,9 +29,21 @@ def show_ai_menu():
         "black_alg": "MCTS",
         "white_abp_depth": 3,
         "black_abp_depth": 3,
+        "white_move_time": 0.0,
+        "black_move_time": 0.0,
         "white_mcts_sims": 500,
         "black_mcts_sims": 500,
-        "num_games": 1
+        "white_mcts_workers": 1,
+        "black_mcts_workers": 1,
+        "white_mcts_batch": 1,
+        "black_mcts_batch": 1,
+        "white_abp_workers": 1,
+        "black_abp_workers": 1,
+        "num_games": 1,
+        "show_stats": False,
+        "position_cache": False,
+        "stats_file": "",
+        "record_file": ""
     }
 
     def start_callback():
@@ -35,20 +51,38 @@ def show_ai_menu():
         config["black_alg"] = dpg.get_value("black_alg")
         config["white_abp_depth"] = dpg.get_value("white_abp_depth")
         config["black_abp_depth"] = dpg.get_value("black_abp_depth")
+        config["white_move_time"] = dpg.get_value("white_move_time")
+        config["black_move_time"] = dpg.get_value("black_move_time")
         config["white_mcts_sims"] = dpg.get_value("white_mcts_sims")
         config["black_mcts_sims"] = dpg.get_value("black_mcts_sims")
+        config["white_mcts_workers"] = dpg.get_value("white_mcts_workers")
+        config["black_mcts_workers"] = dpg.get_value("black_mcts_workers")
+        config["white_mcts_batch"] = dpg.get_value("white_mcts_batch")
+        config["black_mcts_batch"] = dpg.get_value("black_mcts_batch")
+        config["white_abp_workers"] = dpg.get_value("white_abp_workers")
+        config["black_abp_workers"] = dpg.get_value("black_abp_workers")
         config["num_games"] = dpg.get_value("num_games")
+        config["show_stats"] = dpg.get_value("show_stats")
+        config["position_cache"] = dpg.get_value("position_cache")
+        config["stats_file"] = dpg.get_value("stats_file")
+        config["record_file"] = dpg.get_value("record_file")
         dpg.stop_dearpygui()
 
     def toggle_white_params(sender, app_data):
         alg = app_data
         dpg.configure_item("white_abp_depth", show=(alg == "ABP"))
+        dpg.configure_item("white_abp_workers", show=(alg == "ABP"))
         dpg.configure_item("white_mcts_sims", show=(alg == "MCTS"))
+        dpg.configure_item("white_mcts_workers", show=(alg == "MCTS"))
+        dpg.configure_item("white_mcts_batch", show=(alg == "MCTS"))
 
     def toggle_black_params(sender, app_data):
         alg = app_data
         dpg.configure_item("black_abp_depth", show=(alg == "ABP"))
+        dpg.configure_item("black_abp_workers", show=(alg == "ABP"))
         dpg.configure_item("black_mcts_sims", show=(alg == "MCTS"))
+        dpg.configure_item("black_mcts_workers", show=(alg == "MCTS"))
+        dpg.configure_item("black_mcts_batch", show=(alg == "MCTS"))
 
     with dpg.window(label="Configure AI Parameters", width=800, height=800):
         dpg.add_text("Note: Increasing depth or simulations may significantly slow down the game.\nPlease keep values reasonable.", color=(255, 100, 100))
@@ -58,13 +92,25 @@ def show_ai_menu():
 
         dpg.add_combo(["ABP", "MCTS", "Random"], label="White AI", default_value="ABP", tag="white_alg", callback=toggle_white_params)
         dpg.add_slider_int(label="White ABP Depth", default_value=3, min_value=1, max_value=5, tag="white_abp_depth")
+        dpg.add_slider_int(label="White ABP Worker Processes", default_value=1, min_value=1, max_value=os.cpu_count() or 1, tag="white_abp_workers")
         dpg.add_slider_int(label="White MCTS Simulations", default_value=500, min_value=100, max_value=2000, tag="white_mcts_sims", show=False)
+        dpg.add_slider_int(label="White MCTS Worker Processes", default_value=1, min_value=1, max_value=os.cpu_count() or 1, tag="white_mcts_workers", show=False)
+        dpg.add_slider_int(label="White MCTS Rollout Batch (1 = no NumPy batching)", default_value=1, min_value=1, max_value=256, tag="white_mcts_batch", show=False)
+        dpg.add_slider_float(label="White Time per Move (s, 0 = use depth/simulations)", default_value=0.0, min_value=0.0, max_value=5.0, format="%.1f", tag="white_move_time")
 
         dpg.add_combo(["ABP", "MCTS", "Random"], label="Black AI", default_value="MCTS", tag="black_alg", callback=toggle_black_params)
         dpg.add_slider_int(label="Black ABP Depth", default_value=3, min_value=1, max_value=5, tag="black_abp_depth", show=False)
+        dpg.add_slider_int(label="Black ABP Worker Processes", default_value=1, min_value=1, max_value=os.cpu_count() or 1, tag="black_abp_workers", show=False)
         dpg.add_slider_int(label="Black MCTS Simulations", default_value=500, min_value=100, max_value=2000, tag="black_mcts_sims")
+        dpg.add_slider_int(label="Black MCTS Worker Processes", default_value=1, min_value=1, max_value=os.cpu_count() or 1, tag="black_mcts_workers")
+        dpg.add_slider_int(label="Black MCTS Rollout Batch (1 = no NumPy batching)", default_value=1, min_value=1, max_value=256, tag="black_mcts_batch")
+        dpg.add_slider_float(label="Black Time per Move (s, 0 = use depth/simulations)", default_value=0.0, min_value=0.0, max_value=5.0, format="%.1f", tag="black_move_time")
 
         dpg.add_slider_int(label="Number of Games", default_value=1, min_value=1, max_value=9, tag="num_games")
+        dpg.add_checkbox(label="Show Search Statistics", default_value=False, tag="show_stats")
+        dpg.add_checkbox(label="Share a Move Cache Between the Agents of Each Game", default_value=False, tag="position_cache")
+        dpg.add_input_text(label="Statistics File (.csv or .jsonl, empty = none)", default_value="", tag="stats_file")
+        dpg.add_input_text(label="Game Record File (empty = none)", default_value="", tag="record_file")
         dpg.add_button(label="Start", callback=start_callback)
 
     dpg.setup_dearpygui()
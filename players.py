@@ -0,0 +1,20 @@
+from agents.abp import ABPPlayer
+from agents.mcts import MCTSPlayer
+from agents.random import RandomPlayer
+from tablebase import default_tablebase
+
+
+def create_player(alg, color, abp_depth, mcts_sims, abp_time=None, mcts_workers=1, mcts_batch=1, abp_workers=1,
+                  position_cache=None):
+    if alg == "ABP":
+        return ABPPlayer(color, depth=abp_depth, time_limit=abp_time, tablebase=default_tablebase(),
+                         workers=abp_workers, position_cache=position_cache)
+    elif alg == "MCTS":
+        return MCTSPlayer(color, simulations=mcts_sims, workers=mcts_workers, batch_size=mcts_batch,
+                          tablebase=default_tablebase(), position_cache=position_cache)
+    elif alg == "Random":
+        player = RandomPlayer(color)
+        player.position_cache = position_cache
+        return player
+    else:
+        raise ValueError(f"Unknown algorithm {alg}")
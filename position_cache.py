@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from constants import *
+
+
+class PositionCache:
+    """Bounded LRU cache of Board.get_all_moves and check_winner results, keyed by Zobrist hash.
+
+    One cache can be handed to several agents in the same process; `hits` and `misses`
+    show how much move generation they would otherwise have repeated.
+    """
+
+    def __init__(self, size=POSITION_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        entries = self.entries
+        value = entries.get(key)
+        if value is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return value
+
+    def _store(self, key, value):
+        entries = self.entries
+        entries[key] = value
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def get_all_moves(self, board, color):
+        key = (board.hash, color)
+        moves = self._lookup(key)
+        if moves is None:
+            moves = tuple(board.get_all_moves(color))
+            self._store(key, moves)
+        return list(moves)  # callers sort and shuffle the list they get
+
+    def check_winner(self, board):
+        key = (board.hash, None)
+        winner = self._lookup(key)
+        if winner is None:
+            winner = board.check_winner() or ""  # "" marks a game still running, None a miss
+            self._store(key, winner)
+        return winner or None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries),
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+
+_SHARED = {}
+
+
+def shared_position_cache(size=POSITION_CACHE_SIZE):
+    """The process-wide cache of the given size, created on first use."""
+    if size not in _SHARED:
+        _SHARED[size] = PositionCache(size)
+    return _SHARED[size]
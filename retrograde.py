@@ -0,0 +1,455 @@
+import os
+from math import comb
+import numpy as np
+from tablebase import signature_layout, signature_size
+
+# The solver behind tablebase.generate. Positions are handled in bulk as (N, pieces) arrays of
+# squares (row * 8 + col) in signature order: white men, white kings, black men, black kings,
+# ascending within each kind. Square 64 stands for "off the board".
+OFF = 64
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+# Cells of an (N, 65) grid: 0 when empty, else the kind of piece; the extra cell 64 is a wall.
+EMPTY, WM, WK, BM, BK, WALL = 0, 1, 2, 3, 4, 5
+KIND_CODES = (WM, WK, BM, BK)
+MEN = (WM, BM)
+KINGS = (WK, BK)
+MAN_DIRS = ((UP, LEFT, RIGHT), (DOWN, LEFT, RIGHT))  # white, black
+ORIGIN_DIRS = ((DOWN, RIGHT, LEFT), (UP, RIGHT, LEFT))  # where a man's quiet move came from
+ENEMY = np.array([[False, False, False, True, True, False],
+                  [False, True, True, False, False, False]])
+CROWNING = np.zeros((2, OFF + 1), dtype=bool)
+CROWNING[0, :8] = True
+CROWNING[1, 56:64] = True
+CHUNK = 1 << 16  # placements a forward job handles at once
+FRONTIER_CHUNK = 1 << 15  # positions whose predecessors are generated at once, up to ~50 each
+
+
+def _build_next():
+    table = np.full((4, OFF + 1), OFF, dtype=np.int64)
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        for d, (dr, dc) in enumerate(((-1, 0), (1, 0), (0, -1), (0, 1))):
+            if 0 <= row + dr < 8 and 0 <= col + dc < 8:
+                table[d, sq] = sq + dr * 8 + dc
+    return table
+
+
+NEXT = _build_next()
+COMB = np.array([[comb(n, k) for k in range(17)] for n in range(65)], dtype=np.int64)
+
+
+def _rank(positions):
+    """Combinatorial number system rank of each row of an ascending (N, k) array."""
+    rank = np.zeros(positions.shape[0], dtype=np.int64)
+    for i in range(positions.shape[1]):
+        rank += COMB[positions[:, i], i + 1]
+    return rank
+
+
+def _unrank(rank, k):
+    """The ascending (N, k) positions with these ranks."""
+    positions = np.empty((rank.shape[0], k), dtype=np.int64)
+    rank = rank.copy()
+    for i in range(k, 0, -1):
+        position = np.searchsorted(COMB[:, i], rank, side="right") - 1
+        positions[:, i - 1] = position
+        rank -= COMB[position, i]
+    return positions
+
+
+def _compress(squares, taken):
+    # Each square counted among those `taken` leaves free; `taken` is ascending per row.
+    positions = squares.copy()
+    for j in range(taken.shape[1]):
+        positions -= taken[:, j:j + 1] < squares
+    return positions
+
+
+def _expand(positions, taken):
+    # Inverse of _compress: the free square at each position.
+    squares = positions.copy()
+    for j in range(taken.shape[1]):
+        squares += taken[:, j:j + 1] <= squares
+    return squares
+
+
+def _sort_rows(a):
+    # Odd-even transposition sort of each row; with a handful of columns this beats np.sort(axis=1).
+    a = a.copy()
+    k = a.shape[1]
+    for rnd in range(k):
+        for i in range(rnd % 2, k - 1, 2):
+            low = np.minimum(a[:, i], a[:, i + 1])
+            a[:, i + 1] = np.maximum(a[:, i], a[:, i + 1])
+            a[:, i] = low
+    return a
+
+
+def _split(sig, squares):
+    bounds = np.cumsum((0,) + tuple(sig))
+    return [_sort_rows(squares[:, bounds[i]:bounds[i + 1]]) for i in range(4)]
+
+
+def _merge(*columns):
+    return _sort_rows(np.concatenate(columns, axis=1))
+
+
+def kind_codes(sig):
+    return np.repeat(np.array(KIND_CODES, dtype=np.int8), sig)
+
+
+def placements_to_squares(sig, block, placements):
+    """Squares of the positions numbered `placements`, all within one block of signature_layout."""
+    wm, wk, bm, bk = sig
+    blocks, wk_size, bk_size, _ = signature_layout(sig)
+    start, mid_size, black_size = blocks[block]
+    rest = placements - start
+    rest, bk_rank = np.divmod(rest, bk_size)
+    rest, wk_rank = np.divmod(rest, wk_size)
+    rest, bm_rank = np.divmod(rest, black_size)
+    row7_rank, mid_rank = np.divmod(rest, mid_size)
+    whites = np.concatenate((_unrank(mid_rank, wm - block) + 8, _unrank(row7_rank, block) + 56), axis=1)
+    blacks = _expand(_unrank(bm_rank, bm), whites)
+    men = _merge(whites, blacks)
+    white_kings = _expand(_unrank(wk_rank, wk), men)
+    black_kings = _expand(_unrank(bk_rank, bk), _merge(men, white_kings))
+    return np.concatenate((whites, white_kings, blacks, black_kings), axis=1)
+
+
+def squares_to_index(sig, squares, black_to_move):
+    """tablebase.position_index for every row of `squares`; kinds need not be sorted."""
+    wm = sig[0]
+    blocks, wk_size, bk_size, _ = signature_layout(sig)
+    starts, mid_sizes, black_sizes = (np.array(column, dtype=np.int64) for column in zip(*blocks))
+    whites, white_kings, blacks, black_kings = _split(sig, squares)
+    block = (whites >= 56).sum(axis=1)
+    # The lowest wm - block white men stand on rows 1-6, the others on row 7.
+    order = np.arange(wm)
+    on_row7 = order >= (wm - block)[:, None]
+    mid_rank = np.where(on_row7, 0, COMB[np.where(on_row7, 0, whites - 8), order + 1]).sum(axis=1)
+    row7_rank = np.where(on_row7, COMB[np.where(on_row7, whites - 56, 0),
+                                       np.maximum(order - (wm - block)[:, None] + 1, 0)], 0).sum(axis=1)
+    index = row7_rank * mid_sizes[block] + mid_rank
+    index = index * black_sizes[block] + _rank(_compress(blacks, whites))
+    men = _merge(whites, blacks)
+    index = index * wk_size + _rank(_compress(white_kings, men))
+    index = index * bk_size + _rank(_compress(black_kings, _merge(men, white_kings)))
+    return (starts[block] + index) * 2 + black_to_move
+
+
+def _grids(squares, codes):
+    grid = np.zeros((squares.shape[0], OFF + 1), dtype=np.int8)
+    grid[np.arange(squares.shape[0])[:, None], squares] = codes
+    grid[:, OFF] = WALL
+    return grid
+
+
+_TABLES = {}
+
+
+def table_path(scratch, sig):
+    return os.path.join(scratch, "table_{}_{}_{}_{}.npy".format(*sig))
+
+
+def _table(scratch, sig):
+    path = table_path(scratch, sig)
+    if path not in _TABLES:
+        _TABLES[path] = np.load(path, mmap_mode="r")
+    return _TABLES[path]
+
+
+def _grid_values(grids, black_to_move, scratch):
+    """Values of positions from earlier signatures, given as grids, for the side `black_to_move`."""
+    values = np.full(grids.shape[0], -1, dtype=np.int16)  # no pieces left: lost on the spot
+    if not grids.shape[0]:
+        return values
+    counts = [(grids[:, :OFF] == code).sum(axis=1) for code in KIND_CODES]
+    alive = counts[2] + counts[3] > 0 if black_to_move else counts[0] + counts[1] > 0
+    # One number per signature, base 32, so that rows are grouped with a plain 1-D unique.
+    keys = ((counts[0] * 32 + counts[1]) * 32 + counts[2]) * 32 + counts[3]
+    for key in np.unique(keys[alive]).tolist():
+        members = np.flatnonzero(alive & (keys == key))
+        sig = (key >> 15, key >> 10 & 31, key >> 5 & 31, key & 31)
+        squares = np.concatenate([np.nonzero(grids[members, :OFF] == code)[1].reshape(len(members), count)
+                                  for code, count in zip(KIND_CODES, sig)], axis=1)
+        values[members] = _table(scratch, sig)[squares_to_index(sig, squares, black_to_move)]
+    return values
+
+
+def _capture_children(grid, squares, codes, black):
+    """Every capture sequence of the side to move, as (row, grid after it)."""
+    rows = np.arange(grid.shape[0])
+    own = np.isin(codes, KINGS[black:black + 1] + MEN[black:black + 1])
+    movers = np.flatnonzero(own)
+    parent = np.repeat(rows, len(movers))
+    at = squares[:, movers].ravel()
+    code = np.tile(codes[movers], len(rows)).astype(np.int8)
+    boards = grid[parent]
+    depth = 0
+    found_parent, found_grid = [], []
+    while parent.shape[0]:
+        cells = boards.ravel()
+        offsets = np.arange(parent.shape[0]) * (OFF + 1)
+        king = code == KINGS[black]
+        extended = np.zeros(parent.shape[0], dtype=bool)
+        next_parent, next_at, next_code, next_boards = [], [], [], []
+        for d in range(4):
+            allowed = king | (d in MAN_DIRS[black])
+            over = NEXT[d][at]
+            for _ in range(6):
+                # A king flies over empty squares up to the first piece in its way.
+                slide = king & (cells[offsets + over] == EMPTY)
+                if not slide.any():
+                    break
+                over = np.where(slide, NEXT[d][over], over)
+            land = NEXT[d][over]
+            ok = allowed & ENEMY[black][cells[offsets + over]] & (cells[offsets + land] == EMPTY)
+            if not ok.any():
+                continue
+            extended |= ok
+            taken = np.flatnonzero(ok)
+            child = boards[taken]
+            kept = np.arange(taken.shape[0])
+            child[kept, at[taken]] = EMPTY
+            child[kept, over[taken]] = EMPTY
+            landed = np.where(CROWNING[black][land[taken]], KINGS[black], code[taken]).astype(np.int8)
+            child[kept, land[taken]] = landed
+            next_parent.append(parent[taken])
+            next_at.append(land[taken])
+            next_code.append(landed)
+            next_boards.append(child)
+        if depth:
+            done = ~extended
+            found_parent.append(parent[done])
+            found_grid.append(boards[done])
+        if not next_parent:
+            break
+        parent, at, code, boards = (np.concatenate(parts) for parts in
+                                    (next_parent, next_at, next_code, next_boards))
+        depth += 1
+    if not found_parent:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, OFF + 1), dtype=np.int8)
+    return np.concatenate(found_parent), np.concatenate(found_grid)
+
+
+def _forward(job):
+    """Moves of every position in a range of placements, both sides to move.
+
+    Returns (first placement, values, quiet moves within the signature, capture available,
+    pending, loss floor), each interleaved like the table. Positions with a capture or with no
+    quiet move inside the signature get their final value here, from earlier tables. The others
+    keep, from crowning moves, the quickest win they lead to as a positive `pending`, and the
+    slowest loss as `floor`, -1 when one of them is a draw or a win for the side to move.
+    """
+    sig, block, first, last, scratch = job
+    squares = placements_to_squares(sig, block, np.arange(first, last, dtype=np.int64))
+    codes = kind_codes(sig)
+    grid = _grids(squares, codes)
+    n = squares.shape[0]
+    rows = np.arange(n)
+    cells = grid.ravel()
+    offsets = rows * (OFF + 1)
+    shape = (n, 2)
+    values = np.zeros(shape, dtype=np.int16)
+    counts = np.zeros(shape, dtype=np.uint8)
+    captures = np.zeros(shape, dtype=bool)
+    pending = np.zeros(shape, dtype=np.int16)
+    floors = np.zeros(shape, dtype=np.int16)
+    for black in (0, 1):
+        count = np.zeros(n, dtype=np.int64)
+        capture = np.zeros(n, dtype=bool)
+        crown_rows, crown_grids = [], []
+        for j in np.flatnonzero(codes == MEN[black]):
+            sq = squares[:, j]
+            for d in MAN_DIRS[black]:
+                to = NEXT[d][sq]
+                free = cells[offsets + to] == EMPTY
+                crowned = free & CROWNING[black][to]
+                count += free & ~crowned
+                capture |= ENEMY[black][cells[offsets + to]] & (cells[offsets + NEXT[d][to]] == EMPTY)
+                if crowned.any():
+                    child = grid[crowned]
+                    kept = np.arange(child.shape[0])
+                    child[kept, sq[crowned]] = EMPTY
+                    child[kept, to[crowned]] = KINGS[black]
+                    crown_rows.append(rows[crowned])
+                    crown_grids.append(child)
+        for j in np.flatnonzero(codes == KINGS[black]):
+            for d in range(4):
+                to = NEXT[d][squares[:, j]]
+                sliding = np.ones(n, dtype=bool)
+                for _ in range(7):
+                    cell = cells[offsets + to]
+                    free = sliding & (cell == EMPTY)
+                    count += free
+                    capture |= sliding & ~free & ENEMY[black][cell] & (cells[offsets + NEXT[d][to]] == EMPTY)
+                    sliding = free
+                    if not sliding.any():
+                        break
+                    to = NEXT[d][to]
+
+        # Every move of a capture position, and every crowning move, leaves the signature.
+        taking = np.flatnonzero(capture)
+        parent, child_grids = _capture_children(grid[taking], squares[taking], codes, black)
+        parent = taking[parent]
+        for crowners, grids in zip(crown_rows, crown_grids):
+            quiet = ~capture[crowners]
+            parent = np.concatenate((parent, crowners[quiet]))
+            child_grids = np.concatenate((child_grids, grids[quiet]))
+        child = _grid_values(child_grids, not black, scratch)
+
+        # Win in -child plies through a lost child, or lose in `child` plies when all children win.
+        fastest_win = np.full(n, np.iinfo(np.int16).max, dtype=np.int16)
+        np.minimum.at(fastest_win, parent[child < 0], -child[child < 0])
+        slowest_loss = np.zeros(n, dtype=np.int16)
+        np.maximum.at(slowest_loss, parent[child > 0], child[child > 0])
+        external = np.bincount(parent, minlength=n)
+        unwon = np.bincount(parent, weights=child <= 0, minlength=n) > 0
+        wins = fastest_win < np.iinfo(np.int16).max
+
+        final = capture | (count == 0)
+        value = np.where(wins, fastest_win + 1, np.where(unwon, 0, -(slowest_loss + 1)))
+        value[final & (external == 0)] = -1  # no move at all
+        values[:, black] = np.where(final, value, 0)
+        counts[:, black] = np.where(final, 0, count)
+        captures[:, black] = capture
+        pending[:, black] = np.where(~final & wins, fastest_win, 0)
+        floors[:, black] = np.where(unwon, -1, slowest_loss)
+    return first, values.ravel(), counts.ravel(), captures.ravel(), pending.ravel(), floors.ravel()
+
+
+def predecessors(sig, indices):
+    """Every position one quiet move before `indices` by the side that is not to move there.
+
+    Crowning moves and captures leave the signature, so these are the only moves within it.
+    """
+    blocks = signature_layout(sig)[0]
+    starts = np.array([block[0] for block in blocks], dtype=np.int64)
+    codes = kind_codes(sig)
+    found = [np.zeros(0, dtype=np.int64)]
+    placements = indices >> 1
+    block_of = np.searchsorted(starts, placements, side="right") - 1
+    for block in np.unique(block_of):
+        for black in (0, 1):
+            chosen = (block_of == block) & ((indices & 1) == black)
+            if not chosen.any():
+                continue
+            squares = placements_to_squares(sig, int(block), placements[chosen])
+            grid = _grids(squares, codes)
+            rows = np.arange(squares.shape[0])
+            cells = grid.ravel()
+            offsets = rows * (OFF + 1)
+            mover = 1 - black
+            moved_rows, moved_cols, origins = [], [], []
+            for j in np.flatnonzero(codes == MEN[mover]):
+                for d in ORIGIN_DIRS[mover]:
+                    origin = NEXT[d][squares[:, j]]
+                    free = cells[offsets + origin] == EMPTY
+                    moved_rows.append(rows[free])
+                    moved_cols.append(np.full(int(free.sum()), j))
+                    origins.append(origin[free])
+            for j in np.flatnonzero(codes == KINGS[mover]):
+                for d in range(4):
+                    origin = NEXT[d][squares[:, j]]
+                    sliding = np.ones(rows.shape[0], dtype=bool)
+                    for _ in range(7):
+                        sliding &= cells[offsets + origin] == EMPTY
+                        if not sliding.any():
+                            break
+                        moved_rows.append(rows[sliding])
+                        moved_cols.append(np.full(int(sliding.sum()), j))
+                        origins.append(origin[sliding])
+                        origin = NEXT[d][origin]
+            if not moved_rows:
+                continue
+            moved_rows = np.concatenate(moved_rows)
+            before = squares[moved_rows]
+            before[np.arange(moved_rows.shape[0]), np.concatenate(moved_cols)] = np.concatenate(origins)
+            found.append(squares_to_index(sig, before, mover))
+    return np.concatenate(found)
+
+
+def _scratch_array(scratch, name, size, dtype):
+    return np.lib.format.open_memmap(os.path.join(scratch, name), mode="w+", dtype=dtype, shape=(size,))
+
+
+def _chunks(size, step):
+    return ((first, min(first + step, size)) for first in range(0, size, step))
+
+
+def _frontier(table, value):
+    """Positions holding `value`, at most FRONTIER_CHUNK at a time, read from the table chunk by chunk."""
+    for first, last in _chunks(table.shape[0], 1 << 24):
+        found = np.flatnonzero(table[first:last] == value) + first
+        for start in range(0, found.shape[0], FRONTIER_CHUNK):
+            yield found[start:start + FRONTIER_CHUNK]
+
+
+def solve_signature(sig, scratch, pool=None):
+    """Retrograde analysis of one material balance, level by level in distance to the end.
+
+    The tables of every signature before `sig` in solving order must already be in `scratch`. Work
+    arrays live in memory-mapped scratch files and positions are handled in chunks, so memory
+    use stays bounded whatever the signature's size. Returns the path of the finished table.
+    """
+    size = signature_size(sig)
+    table = _scratch_array(scratch, os.path.basename(table_path(scratch, sig)), size, np.int16)
+    counts = _scratch_array(scratch, "counts.npy", size, np.uint8)
+    captures = _scratch_array(scratch, "captures.npy", size, bool)
+    pending = _scratch_array(scratch, "pending.npy", size, np.int16)
+    floors = _scratch_array(scratch, "floors.npy", size, np.int16)
+
+    jobs = []
+    blocks = signature_layout(sig)[0]
+    for block, (start, _, _) in enumerate(blocks):
+        end = blocks[block + 1][0] if block + 1 < len(blocks) else size // 2
+        jobs.extend((sig, block, first, min(first + CHUNK, end), scratch) for first in range(start, end, CHUNK))
+    results = pool.imap_unordered(_forward, jobs) if pool is not None else map(_forward, jobs)
+    for first, *arrays in results:
+        window = slice(2 * first, 2 * first + arrays[0].shape[0])
+        for target, part in zip((table, counts, captures, pending, floors), arrays):
+            target[window] = part
+
+    horizon = 0
+    for first, last in _chunks(size, 1 << 24):
+        horizon = max(horizon, int(np.abs(table[first:last]).max(initial=0)) - 1,
+                      int(pending[first:last].max(initial=0)))
+    level = 0
+    while level <= horizon:
+        # Wins and losses that were only waiting for this distance.
+        for first, last in _chunks(size, 1 << 24):
+            waiting = pending[first:last]
+            open_ = table[first:last] == 0
+            table[first:last][open_ & (waiting == level) & (level > 0)] = level + 1
+            table[first:last][open_ & (waiting == -level) & (level > 0)] = -level - 1
+
+        # Every position one move before a loss in `level` plies wins in level + 1.
+        # Values written here are never the ones being scanned for, so the table can be read as it changes.
+        for lost in _frontier(table, -level - 1):
+            before = predecessors(sig, lost)
+            before = before[~captures[before]]
+            table[before[table[before] == 0]] = level + 2
+            if before.shape[0]:
+                horizon = max(horizon, level + 1)
+
+        # One before a win loses once all its moves lead to wins, after the slowest of them.
+        for won in _frontier(table, level + 1):
+            before = predecessors(sig, won)
+            before = before[~captures[before]]
+            np.subtract.at(counts, before, 1)
+            beaten = np.unique(before[counts[before] == 0])
+            beaten = beaten[(table[beaten] == 0) & (floors[beaten] >= 0)]
+            distance = np.maximum(floors[beaten], level + 1)
+            now = distance == level + 1
+            table[beaten[now]] = -level - 2
+            pending[beaten[~now]] = -distance[~now]
+            if beaten.shape[0]:
+                horizon = max(horizon, int(distance.max()))
+        level += 1
+
+    table.flush()
+    path = table.filename
+    del table, counts, captures, pending, floors
+    for name in ("counts.npy", "captures.npy", "pending.npy", "floors.npy"):
+        os.remove(os.path.join(scratch, name))
+    return path
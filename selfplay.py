@@ -0,0 +1,204 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from board import new_board
+from tablebase import board_masks
+from tournament import DEFAULT_MAX_PLIES, player_config, build_player
+
+# One row per position: the four piece masks (tablebase.board_masks, bit row * 8 + col), the side to move
+# (0 White, 1 Black), the full path of the move played as squares (row * 8 + col) padded with
+# NO_SQUARE, the final result for the side to move (1 win, 0 draw, -1 loss), the ply and the game
+# it came from. The whole path is kept because two capture chains may share their start and end.
+MAX_PATH = 17  # a chain takes at most the opponent's 16 pieces
+NO_SQUARE = 255
+DTYPE = [("wm", "<u8"), ("wk", "<u8"), ("bm", "<u8"), ("bk", "<u8"), ("turn", "u1"), ("path", "u1", (MAX_PATH,)),
+         ("outcome", "i1"), ("ply", "<u2"), ("game", "<u4")]
+FORMAT = 2  # bumped whenever DTYPE changes; a dataset is only ever extended in its own format
+SHARD_SIZE = 1 << 20
+MANIFEST = "manifest.json"
+
+
+def shard_path(directory, index):
+    return os.path.join(directory, f"shard_{index:05d}.npy")
+
+
+def encode_path(move):
+    return [row * 8 + col for row, col in move] + [NO_SQUARE] * (MAX_PATH - len(move))
+
+
+def decode_path(path):
+    """The move of a row's `path` field, as the tuple of (row, col) squares Board.move_piece takes."""
+    return tuple(divmod(int(sq), 8) for sq in path if sq != NO_SQUARE)
+
+
+def play_selfplay_game(job):
+    """Play one game of `config` against itself; returns (game, first turn, moves, winner or None)."""
+    game, config, seed, random_plies, max_plies = job
+    random.seed(seed)
+    players = {"w": build_player(config, "w"), "b": build_player(config, "b")}
+    budget = config.get("move_time")
+    board = new_board()
+    turn = random.choice(["w", "b"])
+    first_turn = turn
+    moves = []
+    winner = None
+    for ply in range(max_plies):
+        # A few random opening moves keep deterministic agents from replaying the same game.
+        if ply < random_plies:
+            options = board.get_all_moves(turn)
+            move = random.choice(options) if options else None
+        else:
+            move = players[turn].get_move(board, time.monotonic() + budget if budget else None)
+        if not move:
+            winner = "b" if turn == "w" else "w"
+            break
+        board.move_piece(*move)
+        moves.append(move)
+        turn = "b" if turn == "w" else "w"
+    for player in players.values():
+        if hasattr(player, "close"):
+            player.close()
+    return game, first_turn, moves, winner
+
+
+class ShardWriter:
+    """Streams rows into fixed-size .npy files through memory maps, so memory use never grows.
+
+    The manifest records how far the data goes after every game, and a new writer on the same
+    directory carries on from there: an interrupted run loses at most the games in flight.
+    """
+
+    def __init__(self, directory, shard_size=SHARD_SIZE):
+        import numpy as np
+
+        self.np = np
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, MANIFEST)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"format": FORMAT, "shard_size": shard_size, "shards": [], "games": 0,
+                             "positions": 0}
+        if self.manifest.get("format", 1) != FORMAT:
+            raise ValueError(f"{directory} holds format {self.manifest.get('format', 1)} rows, not {FORMAT}")
+        self.shard_size = self.manifest["shard_size"]
+        self.shard = None
+        self.filled = 0
+        if self.manifest["shards"] and self.manifest["shards"][-1] < self.shard_size:
+            self._open(len(self.manifest["shards"]) - 1, "r+")
+            self.filled = self.manifest["shards"][-1]
+
+    def _open(self, index, mode):
+        self.shard = self.np.lib.format.open_memmap(shard_path(self.directory, index), mode=mode,
+                                                    dtype=DTYPE, shape=(self.shard_size,))
+
+    def write_game(self, game, first_turn, moves, winner):
+        board = new_board()
+        turn = first_turn
+        for ply, move in enumerate(moves):
+            if self.shard is None or self.filled == self.shard_size:
+                self._next_shard()
+            row = self.shard[self.filled]
+            row["wm"], row["wk"], row["bm"], row["bk"] = board_masks(board)
+            row["turn"] = turn == "b"
+            row["path"] = encode_path(move)
+            row["outcome"] = 0 if winner is None else (1 if winner == turn else -1)
+            row["ply"] = ply
+            row["game"] = game
+            self.filled += 1
+            self.manifest["shards"][-1] = self.filled
+            board.move_piece(*move)
+            turn = "b" if turn == "w" else "w"
+        self.manifest["games"] += 1
+        self.manifest["positions"] += len(moves)
+        self.commit()
+
+    def _next_shard(self):
+        if self.shard is not None:
+            self.shard.flush()
+        self.manifest["shards"].append(0)
+        self._open(len(self.manifest["shards"]) - 1, "w+")
+        self.filled = 0
+
+    def commit(self):
+        # The rows reach the file before the manifest that counts them.
+        if self.shard is not None:
+            self.shard.flush()
+        temp = self.manifest_path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(temp, self.manifest_path)
+
+    def close(self):
+        self.commit()
+        self.shard = None
+
+
+def load_dataset(directory):
+    """Yield every shard of a dataset as a read-only memory map holding only its written rows."""
+    import numpy as np
+
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    for index, filled in enumerate(manifest["shards"]):
+        yield np.load(shard_path(directory, index), mmap_mode="r")[:filled]
+
+
+def generate(directory, config, games, workers=None, seed=0, random_plies=4, max_plies=DEFAULT_MAX_PLIES,
+             shard_size=SHARD_SIZE, progress_every=100):
+    """Play self-play games until the dataset in `directory` holds `games` of them."""
+    writer = ShardWriter(directory, shard_size)
+    done = writer.manifest["games"]
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    new_positions = 0
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            # Jobs go out in small batches so that neither the task queue nor the results pile up.
+            batch = workers * 4
+            while done < games:
+                jobs = [(game, config, seed + game, random_plies, max_plies)
+                        for game in range(done, min(games, done + batch))]
+                # In order, so the manifest's game count always names the next game to play.
+                for result in pool.imap(play_selfplay_game, jobs):
+                    writer.write_game(*result)
+                    new_positions += len(result[2])
+                    done += 1
+                    if progress_every and done % progress_every == 0:
+                        elapsed = time.perf_counter() - start
+                        print(f"{done}/{games} games, {writer.manifest['positions']} positions, "
+                              f"{new_positions / elapsed:.0f} positions/s")
+    finally:
+        writer.close()
+    return writer.manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write self-play positions, moves and results as .npy shards.")
+    parser.add_argument("--alg", choices=["ABP", "MCTS", "Random"], default="ABP")
+    parser.add_argument("--depth", type=int, default=3, help="ABP search depth")
+    parser.add_argument("--sims", type=int, default=500, help="MCTS simulations")
+    parser.add_argument("--batch", type=int, default=1, help="MCTS leaves per NumPy rollout batch")
+    parser.add_argument("--move-time", type=float, default=None, help="seconds per move, replacing depth/simulations")
+    parser.add_argument("--games", type=int, default=1000, help="total games wanted in the dataset")
+    parser.add_argument("--output", default="selfplay", help="dataset directory; an existing one is extended")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to all cores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random-plies", type=int, default=4, help="random opening moves per game")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES)
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="positions per shard file")
+    args = parser.parse_args()
+
+    config = player_config(args.alg, args.depth, args.sims, mcts_batch=args.batch, move_time=args.move_time)
+    manifest = generate(args.output, config, args.games, args.workers, args.seed, args.random_plies,
+                        args.max_plies, args.shard_size)
+    print(f"{manifest['games']} games, {manifest['positions']} positions in {len(manifest['shards'])} shards")
+
+
+if __name__ == "__main__":
+    main()
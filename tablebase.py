@@ -0,0 +1,212 @@
+import argparse
+import itertools
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+from functools import lru_cache
+from math import comb
+from constants import *
+
+# File layout: header, one signature record per material balance, then int16 values.
+# A value v > 0 means the side to move wins in v - 1 plies, v < 0 that it loses in -v - 1 plies
+# and 0 a draw. Slots are numbered by position_index, with no gaps.
+MAGIC = b"ACTB"
+VERSION = 2
+HEADER = struct.Struct("<4sHHI")  # magic, version, max pieces, signature count
+RECORD = struct.Struct("<4BQ")  # white men, white kings, black men, black kings, first value
+WIN, LOSS, DRAW = "win", "loss", "draw"
+
+
+def signatures(max_pieces):
+    """Material balances (white men, white kings, black men, black kings) in solving order.
+
+    Captures lead to fewer pieces and promotions to fewer men, so every successor of a
+    position belongs to a signature that comes earlier, or to its own.
+    """
+    result = []
+    for total in range(2, max_pieces + 1):
+        for wm, wk, bm, bk in itertools.product(range(total + 1), repeat=4):
+            if wm + wk + bm + bk == total and wm + wk and bm + bk:
+                result.append((wm, wk, bm, bk))
+    result.sort(key=lambda sig: (sum(sig), sig[0] + sig[2]))
+    return result
+
+
+@lru_cache(maxsize=None)
+def signature_layout(sig):
+    """How the positions of a material balance are numbered.
+
+    White men come first, on rows 1-7. How many of them stand on row 7 picks a block, and within
+    it their squares on row 7 and on rows 1-6 are ranked separately. Black men follow on the squares
+    of rows 0-6 the white men left, then white kings and black kings on whatever is still empty.
+    Returns ((first placement, rows 1-6 count, black men count) per block, white king count,
+    black king count, placements in all), so no number is spent on an illegal or doubled square.
+    """
+    wm, wk, bm, bk = sig
+    wk_size = comb(64 - wm - bm, wk)
+    bk_size = comb(64 - wm - bm - wk, bk)
+    blocks = []
+    start = 0
+    for on_row7 in range(min(wm, 8) + 1):
+        mid_size, black_size = comb(48, wm - on_row7), comb(56 - wm + on_row7, bm)
+        blocks.append((start, mid_size, black_size))
+        start += comb(8, on_row7) * mid_size * black_size * wk_size * bk_size
+    return tuple(blocks), wk_size, bk_size, start
+
+
+def signature_size(sig):
+    return signature_layout(sig)[3] * 2
+
+
+def _rank(positions):
+    # Rank of an ascending set of positions in the combinatorial number system.
+    return sum(comb(position, i) for i, position in enumerate(positions, 1))
+
+
+def _squares(mask):
+    result = []
+    while mask:
+        lsb = mask & -mask
+        result.append(lsb.bit_length() - 1)
+        mask ^= lsb
+    return result
+
+
+def _free_positions(mask, taken):
+    # Each square of `mask` counted among the squares `taken` leaves free.
+    return [sq - (taken & ((1 << sq) - 1)).bit_count() for sq in _squares(mask)]
+
+
+def position_index(sig, wm, wk, bm, bk, color):
+    """Slot of a position within its signature's values, following signature_layout."""
+    blocks, wk_size, bk_size, _ = signature_layout(sig)
+    whites = _squares(wm)
+    mid = len(whites) - sum(sq >= 56 for sq in whites)
+    start, mid_size, black_size = blocks[len(whites) - mid]
+    index = _rank([sq - 56 for sq in whites[mid:]]) * mid_size + _rank([sq - 8 for sq in whites[:mid]])
+    index = index * black_size + _rank(_free_positions(bm, wm))
+    index = index * wk_size + _rank(_free_positions(wk, wm | bm))
+    index = index * bk_size + _rank(_free_positions(bk, wm | bm | wk))
+    return (start + index) * 2 + (color == "b")
+
+
+def board_masks(board):
+    if hasattr(board, "wm"):
+        return board.wm, board.wk, board.bm, board.bk
+    masks = {"w": 0, "W": 0, "b": 0, "B": 0}
+    for row, pieces in enumerate(board.board):
+        for col, piece in enumerate(pieces):
+            if piece != 0:
+                masks[piece] |= 1 << (row * 8 + col)
+    return masks["w"], masks["W"], masks["b"], masks["B"]
+
+
+class Tablebase:
+    """Memory-mapped reader for files written by `generate`; a probe is a few integer reads."""
+
+    def __init__(self, path):
+        self.path = path
+        self._open()
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.max_pieces, count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} tablebase")
+        self.offsets = {}
+        for i in range(count):
+            wm, wk, bm, bk, offset = RECORD.unpack_from(self.mm, HEADER.size + i * RECORD.size)
+            self.offsets[(wm, wk, bm, bk)] = offset
+        self.values = memoryview(self.mm)[HEADER.size + count * RECORD.size:].cast("h")
+
+    # mmap objects cannot be pickled; a copy sent to another process maps the file again.
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._open()
+
+    def probe(self, board, color):
+        """Return (WIN/LOSS/DRAW, plies to the end) for `color` to move, or None if not covered."""
+        wm, wk, bm, bk = board_masks(board)
+        sig = (wm.bit_count(), wk.bit_count(), bm.bit_count(), bk.bit_count())
+        if sum(sig) > self.max_pieces:
+            return None
+        if not (wm | wk if color == "w" else bm | bk):
+            return LOSS, 0
+        offset = self.offsets.get(sig)
+        if offset is None:
+            return None
+        value = self.values[offset + position_index(sig, wm, wk, bm, bk, color)]
+        if value > 0:
+            return WIN, value - 1
+        if value < 0:
+            return LOSS, -value - 1
+        return DRAW, None
+
+
+_DEFAULT = {}
+
+
+def default_tablebase():
+    """The tablebase at TABLEBASE_PATH, opened once per process, or None when it was never generated."""
+    if TABLEBASE_PATH not in _DEFAULT:
+        _DEFAULT[TABLEBASE_PATH] = Tablebase(TABLEBASE_PATH) if os.path.exists(TABLEBASE_PATH) else None
+    return _DEFAULT[TABLEBASE_PATH]
+
+
+def generate(path, max_pieces=3, workers=1, verbose=True):
+    """Solve every signature with up to `max_pieces` pieces and write them to `path`.
+
+    The work happens in retrograde.py with NumPy; its scratch files go next to `path` and are
+    removed at the end.
+    """
+    import shutil
+    import tempfile
+    import numpy as np
+    from retrograde import solve_signature
+
+    sigs = signatures(max_pieces)
+    scratch = tempfile.mkdtemp(prefix="tablebase-", dir=os.path.dirname(os.path.abspath(path)))
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        tables = []
+        for sig in sigs:
+            start = time.perf_counter()
+            tables.append(solve_signature(sig, scratch, pool))
+            if verbose:
+                table = np.load(tables[-1], mmap_mode="r")
+                print(f"{sig}: {table.shape[0]} slots, {int((table > 0).sum())} wins, "
+                      f"{int((table < 0).sum())} losses, {time.perf_counter() - start:.1f}s")
+
+        with open(path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, max_pieces, len(sigs)))
+            offset = 0
+            for sig in sigs:
+                out.write(RECORD.pack(*sig, offset))
+                offset += signature_size(sig)
+            for table_path in tables:
+                table = np.load(table_path, mmap_mode="r")
+                for first in range(0, table.shape[0], 1 << 24):
+                    out.write(table[first:first + (1 << 24)].astype("<i2").tobytes())
+    finally:
+        if pool is not None:
+            pool.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve every endgame with up to N pieces by retrograde analysis.")
+    parser.add_argument("--pieces", type=int, default=3, help="largest number of pieces on the board")
+    parser.add_argument("--output", default=TABLEBASE_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    generate(args.output, args.pieces, args.workers)
+
+
+if __name__ == "__main__":
+    main()
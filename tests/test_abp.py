@@ -0,0 +1,81 @@
+import multiprocessing
+import time
+from agents.abp import ABPPlayer, _WORKER, _init_root_worker, _search_root_move
+from agents.transposition import encode_move
+from benchmark import load_position
+from board import ZOBRIST_BLACK_TO_MOVE
+
+
+def plain_minimax(board, color, player_color, depth):
+    """Full-width minimax without pruning or tables, scored like ABPPlayer.evaluate."""
+    if depth == 0 or board.check_winner() is not None:
+        return board.score if player_color == "w" else -board.score
+    opponent = "b" if color == "w" else "w"
+    scores = []
+    for move in board.get_all_moves(color):
+        undo = board.make_move(*move)
+        scores.append(plain_minimax(board, opponent, player_color, depth - 1))
+        board.unmake_move(undo)
+    return max(scores) if color == player_color else min(scores)
+
+
+def test_search_matches_plain_minimax_and_leaves_board_alone():
+    # Three plies cannot repeat a position, so the table cannot change any score here.
+    for name, color in (("start", "w"), ("midgame", "w"), ("captures", "b"), ("kings", "w")):
+        board = load_position(name)
+        before = (board.hash, [row[:] for row in board.board])
+        player = ABPPlayer(color, depth=3)
+        move = player.get_move(board)
+        assert (board.hash, board.board) == before
+        assert move in board.get_all_moves(color)
+        key = board.hash if color == "w" else board.hash ^ ZOBRIST_BLACK_TO_MOVE
+        depth, _, score, _ = player.tt.probe(key)
+        assert depth == 3
+        assert score == plain_minimax(board, color, color, 3)
+
+
+def test_time_limit_deepens_until_the_deadline():
+    board = load_position("kings")
+    player = ABPPlayer("w", depth=1, time_limit=0.5)
+    start = time.monotonic()
+    move = player.get_move(board)
+    assert time.monotonic() - start < 1.0
+    assert move in board.get_all_moves("w")
+    assert player.depth_reached > 1  # the deadline, not `depth`, ends the search
+
+
+def test_ordering_tries_table_move_then_pv_then_killers():
+    player = ABPPlayer("w")
+    moves = [((5, col), (4, col)) for col in range(6)]
+    player.pv = [moves[3]]
+    player.killers = [[moves[4], moves[5]]]
+    player.history = {("w", moves[1]): 9}
+    ordered = list(moves)
+    player.order_moves(ordered, 0, encode_move(moves[2]), "w")
+    assert ordered[:5] == [moves[2], moves[3], moves[4], moves[5], moves[1]]
+
+
+def test_root_splitting_finds_the_same_score():
+    for name in ("start", "kings"):
+        board = load_position(name)
+        player = ABPPlayer("w", depth=3, workers=2)
+        try:
+            move = player.get_move(board)
+        finally:
+            player.close()
+        assert move in board.get_all_moves("w")
+        depth, _, score, code = player.tt.probe(board.hash)
+        assert depth == 3 and code == encode_move(move)
+        assert score == plain_minimax(board, "w", "w", 3)
+
+
+def test_root_workers_age_their_table_per_job():
+    alpha, stop = multiprocessing.Value("i", -10 ** 6, lock=False), multiprocessing.Value("b", 0, lock=False)
+    _init_root_worker("w", 1, None, alpha, stop, None)
+    move = load_position("start").get_all_moves("w")[0]
+    table = _WORKER["player"].tt
+    for generation in (1, 2):
+        # Each job gets its own copy of the board in a real pool, and plays the move on it.
+        index, score, nodes = _search_root_move((load_position("start"), 0, move, 3, None, 0))
+        assert index == 0 and score is not None and nodes > 0
+        assert table.generation == generation
@@ -0,0 +1,45 @@
+import time
+from agent_worker import AgentWorker
+from agents.abp import ABPPlayer
+from agents.random import RandomPlayer
+from board import new_board
+
+
+def wait_for_move(worker, timeout=10.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        ready, move = worker.poll()
+        if ready:
+            return move
+        time.sleep(0.01)
+    raise AssertionError("no move arrived")
+
+
+def test_request_returns_at_once_and_poll_delivers_the_move():
+    worker = AgentWorker(ABPPlayer("w", depth=3), RandomPlayer("b"))
+    try:
+        board = new_board()
+        start = time.monotonic()
+        worker.request(board, "w")
+        assert time.monotonic() - start < 0.5 and worker.pending
+        move = wait_for_move(worker)
+        assert move in board.get_all_moves("w")
+        assert worker.stats["depth"] == 3 and not worker.pending
+    finally:
+        worker.close()
+
+
+def test_cancel_stops_the_running_search():
+    # Depth 40 never finishes on its own; only the cancel can end it.
+    worker = AgentWorker(ABPPlayer("w", depth=40), RandomPlayer("b"))
+    try:
+        board = new_board()
+        worker.request(board, "w")
+        time.sleep(0.5)
+        worker.cancel()
+        start = time.monotonic()
+        worker.request(board, "b")
+        assert wait_for_move(worker, timeout=5.0) in board.get_all_moves("b")
+        assert time.monotonic() - start < 2.0
+    finally:
+        worker.close()
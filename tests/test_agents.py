@@ -0,0 +1,38 @@
+import multiprocessing
+import threading
+import time
+import pytest
+from agents.abp import ABPPlayer
+from agents.mcts import MCTSPlayer
+from agents.random import RandomPlayer
+from benchmark import load_position
+
+
+@pytest.mark.parametrize("player", [ABPPlayer("w", depth=40), MCTSPlayer("w", simulations=10 ** 9),
+                                    MCTSPlayer("w", simulations=10 ** 9, batch_size=32), RandomPlayer("w")],
+                         ids=["abp", "mcts", "mcts-batch", "random"])
+def test_agents_answer_by_the_deadline(player):
+    board = load_position("kings")
+    start = time.monotonic()
+    move = player.get_move(board, start + 0.5)
+    assert time.monotonic() - start < 1.0
+    assert move in board.get_all_moves("w")
+    assert player.stats["elapsed"] < 1.0
+
+
+def test_stop_ends_a_search_from_another_thread():
+    player = ABPPlayer("w", depth=40)
+    threading.Timer(0.3, player.stop).start()
+    start = time.monotonic()
+    assert player.get_move(load_position("kings")) is not None
+    assert time.monotonic() - start < 1.0
+
+
+def test_moving_the_wanted_ticket_cancels():
+    player = RandomPlayer("w")
+    player.cancel = multiprocessing.Value("i", 3, lock=False)
+    player.ticket = 3
+    player.start_search(None)
+    assert not player.out_of_time()
+    player.cancel.value = 4
+    assert player.out_of_time()
@@ -0,0 +1,73 @@
+import random
+import pytest
+from bitboard import BitBoard
+
+np = pytest.importorskip("numpy")
+from agents import batch_rollout  # noqa: E402
+
+
+def random_positions(count, seed=0):
+    """(BitBoard, side to move) pairs taken from random games, finished ones included."""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, color = BitBoard(), rng.choice("wb")
+        for _ in range(rng.randrange(150)):
+            moves = board.get_all_moves(color)
+            if not moves:
+                break
+            board.move_piece(*rng.choice(moves))
+            color = "b" if color == "w" else "w"
+        positions.append((board, color))
+    return positions
+
+
+def first_steps(moves):
+    """(origin, first landing) squares of every move in one row of legal_moves."""
+    steps = set()
+    for d in range(4):
+        for k in range(batch_rollout.MAX_DISTANCE):
+            mask = int(moves[d, k])
+            while mask:
+                landing = (mask & -mask).bit_length() - 1
+                steps.add((landing - (k + 1) * int(batch_rollout.STEPS[d]), landing))
+                mask &= mask - 1
+    return steps
+
+
+def test_batch_moves_and_results_match_bitboard():
+    positions = random_positions(300)
+    state = np.array([batch_rollout.encode(board) for board, _ in positions])
+    white = np.array([color == "w" for _, color in positions])
+    moves = batch_rollout.legal_moves(state, white)
+    results = batch_rollout.winners(state)
+    for i, (board, color) in enumerate(positions):
+        expected = {(r * 8 + c, er * 8 + ec) for (r, c), (er, ec), *_ in board.get_all_moves(color)}
+        assert first_steps(moves[i]) == expected
+        assert batch_rollout.has_moves(state[i:i + 1], white[i:i + 1])[0] == board.has_moves(color)
+        assert results[i] == {"w": 1, "b": -1, None: 0}[board.check_winner()]
+
+
+def test_simulate_returns_finished_results_at_once():
+    positions = random_positions(200, seed=1)
+    state = np.array([batch_rollout.encode(board) for board, _ in positions])
+    colors = np.array([1 if color == "w" else -1 for _, color in positions])
+    known = batch_rollout.winners(state)
+    results = batch_rollout.simulate(state, colors, rng=np.random.default_rng(0))
+    assert set(results.tolist()) <= {-1, 0, 1}
+    assert (results[known != 0] == known[known != 0]).all()
+
+
+def test_applied_moves_are_legal_moves():
+    positions = [(board, color) for board, color in random_positions(300, seed=2) if board.has_moves(color)]
+    state = np.array([batch_rollout.encode(board) for board, _ in positions])
+    white = np.array([color == "w" for _, color in positions])
+    d, distance, landing = batch_rollout._pick(batch_rollout.legal_moves(state, white), np.random.default_rng(0))
+    batch_rollout.apply_moves(state, d, distance, landing, np.random.default_rng(1))
+    for (board, color), after in zip(positions, state):
+        outcomes = set()
+        for move in board.get_all_moves(color):
+            undo = board.make_move(*move)
+            outcomes.add((board.wm, board.bm, board.wk, board.bk))
+            board.unmake_move(undo)
+        assert tuple(int(mask) for mask in after) in outcomes  # a capture chain is played to its end
@@ -0,0 +1,36 @@
+import pytest
+from board import Board
+from benchmark import POSITIONS, compare, load_position, perft
+
+# Counts at depths 1-3, checked against the list-based Board below.
+PERFT = {"start": (8, 64, 708), "midgame": (2, 2, 20), "kings": (34, 692, 13505), "captures": (4, 5, 35)}
+
+
+def list_board(name):
+    board, bits = Board(), load_position(name)
+    for row in range(8):
+        for col in range(8):
+            board._put(row, col, bits.board[row][col])
+    return board
+
+
+@pytest.mark.parametrize("name", sorted(POSITIONS))
+def test_perft_counts(name):
+    for depth, nodes in enumerate(PERFT[name], 1):
+        assert perft(load_position(name), "w", depth) == nodes
+        assert perft(list_board(name), "w", depth) == nodes
+
+
+def test_compare_flags_changed_counts_and_slower_rates():
+    baseline = {"perft": {"start": {"depth": 5, "nodes": 100, "nodes_per_second": 1000.0}},
+                "abp": {"start/d3": {"nodes_per_second": 500.0}},
+                "mcts": {"start/200": {"simulations_per_second": 50.0}}}
+    same = {"perft": {"start": {"depth": 5, "nodes": 100, "nodes_per_second": 950.0}},
+            "abp": {"start/d3": {"nodes_per_second": 460.0}},
+            "mcts": {"start/200": {"simulations_per_second": 80.0}}}
+    assert compare(same, baseline, 0.1) == []
+    worse = {"perft": {"start": {"depth": 5, "nodes": 101, "nodes_per_second": 1000.0}},
+             "abp": {"start/d3": {"nodes_per_second": 400.0}},
+             "mcts": {"start/200": {"simulations_per_second": 50.0}}}
+    problems = compare(worse, baseline, 0.1)
+    assert len(problems) == 2 and problems[0].startswith("perft start") and problems[1].startswith("abp")
@@ -0,0 +1,50 @@
+import random
+from board import Board, zobrist_key, piece_square_score
+from bitboard import BitBoard
+
+
+def random_games(count, plies=120, seed=0):
+    """Yield (list board, bitboard, side to move) after every ply of `count` random games."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        board, bits = Board(), BitBoard()
+        color = rng.choice("wb")
+        for _ in range(plies):
+            yield board, bits, color
+            moves = board.get_all_moves(color)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            board.move_piece(*move)
+            bits.move_piece(*move)
+            color = "b" if color == "w" else "w"
+
+
+def test_bitboard_matches_board():
+    for board, bits, color in random_games(20):
+        assert bits.board == board.board
+        assert bits.hash == board.hash == zobrist_key(board.board)
+        assert bits.score == board.score == piece_square_score(board.board)
+        assert sorted(bits.get_all_moves(color)) == sorted(board.get_all_moves(color))
+        assert bits.check_winner() == board.check_winner()
+        for row in range(8):
+            for col in range(8):
+                assert bits.get_valid_moves(row, col) == board.get_valid_moves(row, col)
+
+
+def test_make_unmake_restores_bitboard():
+    for _, bits, color in random_games(10, seed=1):
+        masks = (bits.wm, bits.bm, bits.wk, bits.bk, bits.hash, bits.score)
+        for move in bits.get_all_moves(color):
+            undo = bits.make_move(*move)
+            bits.unmake_move(undo)
+            assert (bits.wm, bits.bm, bits.wk, bits.bk, bits.hash, bits.score) == masks
+
+
+def test_grid_view_follows_moves():
+    bits = BitBoard()
+    grid = bits.board
+    assert bits.board is grid  # rebuilt only after a change
+    bits.move_piece((5, 0), (4, 0))
+    assert bits.board is not grid
+    assert bits.board[4][0] == "w" and bits.board[5][0] == 0
@@ -0,0 +1,146 @@
+import random
+from agents.abp import ABPPlayer
+from bitboard import BitBoard
+from board import Board, CHAIN_CACHE, PIECE_SQUARE, piece_square_score
+
+
+def scanned_winner(board):
+    """check_winner as a scan of the whole grid, the way it was before pieces were tracked."""
+    for color, other in (("w", "b"), ("b", "w")):
+        if not any(piece != 0 and piece.lower() == color and board.get_valid_moves(row, col)
+                   for row, pieces in enumerate(board.board) for col, piece in enumerate(pieces)):
+            return other
+    return None
+
+
+def test_tracked_pieces_follow_moves():
+    rng = random.Random(3)
+    for _ in range(20):
+        board = Board()
+        color = "w"
+        for _ in range(300):
+            for side in "wb":
+                assert board.pieces[side] == {(row, col) for row in range(8) for col in range(8)
+                                              if board.board[row][col] != 0
+                                              and board.board[row][col].lower() == side}
+            assert board.check_winner() == scanned_winner(board)
+            moves = board.get_all_moves(color)
+            if not moves:
+                break
+            undo = board.make_move(*rng.choice(moves))
+            if rng.random() < 0.2:
+                board.unmake_move(undo)
+            else:
+                color = "b" if color == "w" else "w"
+
+
+
+def inside(row, col):
+    return 0 <= row < 8 and 0 <= col < 8
+
+
+def walked_moves(board, row, col, only_captures=False):
+    """get_valid_moves by stepping through coordinates, without the precomputed tables."""
+    piece = board.board[row][col]
+    enemies = ("b", "B") if piece.lower() == "w" else ("w", "W")
+    forward = -1 if piece == "w" else 1
+    directions = ((-1, 0), (1, 0), (0, -1), (0, 1)) if piece.isupper() else ((forward, 0), (0, -1), (0, 1))
+    moves = []
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        if piece.islower():
+            if inside(r, c) and board.board[r][c] == 0:
+                if not only_captures:
+                    moves.append((r, c))
+            elif inside(r + dr, c + dc) and board.board[r][c] in enemies and board.board[r + dr][c + dc] == 0:
+                moves.append((r + dr, c + dc))
+            continue
+        while inside(r, c) and board.board[r][c] == 0:
+            if not only_captures:
+                moves.append((r, c))
+            r, c = r + dr, c + dc
+        if inside(r + dr, c + dc) and board.board[r][c] in enemies and board.board[r + dr][c + dc] == 0:
+            moves.append((r + dr, c + dc))
+    return moves
+
+
+def test_move_tables_match_walking_the_board():
+    rng = random.Random(4)
+    for _ in range(10):
+        board = Board()
+        color = "w"
+        for _ in range(200):
+            for row in range(8):
+                for col in range(8):
+                    if board.board[row][col] != 0:
+                        for only_captures in (False, True):
+                            assert (sorted(board.get_valid_moves(row, col, only_captures))
+                                    == sorted(walked_moves(board, row, col, only_captures)))
+            moves = board.get_all_moves(color)
+            if not moves:
+                break
+            board.move_piece(*rng.choice(moves))
+            color = "b" if color == "w" else "w"
+
+
+def position(pieces):
+    board = Board()
+    for row in range(8):
+        for col in range(8):
+            board._put(row, col, pieces.get((row, col), 0))
+    return board
+
+
+def test_chains_run_to_the_end_and_crowned_men_go_on_as_kings():
+    board = position({(6, 0): "w", (5, 0): "b", (3, 0): "b", (1, 0): "b", (0, 3): "b", (7, 7): "W",
+                      (7, 5): "b"})
+    moves = board.get_all_moves("w")
+    assert ((6, 0), (4, 0), (2, 0), (0, 0), (0, 4)) in moves
+    assert ((7, 7), (7, 4)) in moves  # every chain is listed, not only the longest
+    assert all(len(move) > 1 and move[0] in ((6, 0), (7, 7)) for move in moves)
+    board.move_piece((6, 0), (4, 0), (2, 0), (0, 0), (0, 4))
+    assert board.board[0][4] == "W" and board.pieces["b"] == {(7, 5)}
+
+
+def test_memoised_chains_match_a_cold_search():
+    rng = random.Random(5)
+    for _ in range(10):
+        board = Board()
+        color = "w"
+        for _ in range(200):
+            for row, col in list(board.pieces[color]):
+                warm = board.capture_chains(row, col)
+                CHAIN_CACHE.clear()
+                assert board.capture_chains(row, col) == warm
+            moves = board.get_all_moves(color)
+            if not moves:
+                break
+            board.move_piece(*rng.choice(moves))
+            color = "b" if color == "w" else "w"
+
+
+def test_score_is_updated_with_every_move():
+    rng = random.Random(6)
+    for board_type in (Board, BitBoard):
+        board = board_type()
+        color = "w"
+        for _ in range(150):
+            moves = board.get_all_moves(color)
+            if not moves:
+                break
+            for move in moves:
+                undo = board.make_move(*move)
+                assert board.score == piece_square_score(board.board)
+                board.unmake_move(undo)
+            assert board.score == piece_square_score(board.board)
+            board.move_piece(*rng.choice(moves))
+            color = "b" if color == "w" else "w"
+
+
+def test_crowning_and_advancing_raise_the_score():
+    board = position({(1, 3): "w", (6, 6): "b"})
+    assert board.score == PIECE_SQUARE["w"][11] + PIECE_SQUARE["b"][54]
+    before = board.score
+    board.move_piece((1, 3), (0, 3))
+    assert board.score == before - PIECE_SQUARE["w"][11] + PIECE_SQUARE["W"][3] > before
+    assert ABPPlayer("b").evaluate(board) == -board.score
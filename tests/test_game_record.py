@@ -0,0 +1,69 @@
+import pytest
+from game_record import GameRecordWriter, read_games, encode_moves
+from tournament import play_game
+from agents.random import RandomPlayer
+
+
+def test_games_round_trip(tmp_path):
+    path = str(tmp_path / "games.acr")
+    games = []
+    for result in ("w", "draw", "unfinished"):
+        moves = []
+        play_game(RandomPlayer("w"), RandomPlayer("b"), "b", 80, moves=moves)
+        games.append((moves, "b", result, 1.5, {"white": {"alg": "Random"}}))
+    writer = GameRecordWriter(path)
+    writer.write_game(*games[0])
+    writer.close()
+    writer = GameRecordWriter(path)  # a later run appends
+    for game in games[1:]:
+        writer.write_game(*game)
+    writer.close()
+
+    read = list(read_games(path))
+    assert [(game["moves"], game["first_turn"], game["result"], game["seconds"], game["meta"]) for game in read] \
+        == [(list(moves), turn, result, seconds, meta) for moves, turn, result, seconds, meta in games]
+    assert all(game["plies"] == len(moves) for game, (moves, *_) in zip(read, games))
+    assert list(read_games(path, decode=False))[0]["moves"] == encode_moves(games[0][0])
+
+
+def test_a_step_costs_three_bytes():
+    assert encode_moves([((5, 0), (4, 0))]) == bytes([2, 40, 32])
+
+
+def test_game_is_readable_while_it_is_played(tmp_path):
+    path = str(tmp_path / "games.acr")
+    writer = GameRecordWriter(path)
+    first, second = writer.begin_game("w", {"board": 0}), writer.begin_game("b", {"board": 1})
+    writer.append_move(first, ((5, 0), (4, 0)))
+    writer.append_move(second, ((2, 1), (3, 0)))
+    writer.append_move(first, ((5, 2), (4, 1)))
+    games = list(read_games(path))  # nothing has ended, yet every move is already on disk
+    assert [(game["meta"], game["moves"], game["result"], game["seconds"]) for game in games] == [
+        ({"board": 0}, [((5, 0), (4, 0)), ((5, 2), (4, 1))], "unfinished", None),
+        ({"board": 1}, [((2, 1), (3, 0))], "unfinished", None)]
+    writer.end_game(second, "b", 2.0)
+    assert [(game["result"], game["plies"]) for game in read_games(path)] == [("b", 1), ("unfinished", 2)]
+    writer.close()
+
+
+def test_cut_off_game_is_skipped_and_corruption_reported(tmp_path):
+    path = tmp_path / "games.acr"
+    writer = GameRecordWriter(str(path))
+    writer.write_game([((5, 0), (4, 0))], "w", "w", meta={"alg": "ABP"})
+    writer.write_game([((2, 0), (3, 0))], "b", "b", meta={"alg": "MCTS"})
+    writer.close()
+    data = path.read_bytes()
+    path.write_bytes(data[:-1])  # the second game's end record is cut off
+    assert [game["result"] for game in read_games(str(path))] == ["w", "unfinished"]
+    second = data.index(b"MCTS")
+    path.write_bytes(data[:second + 2])  # cut off inside the second game's metadata
+    assert [game["meta"] for game in read_games(str(path))] == [{"alg": "ABP"}]
+
+    writer = GameRecordWriter(str(path))  # a later run drops the half-written record before appending
+    writer.write_game([((5, 2), (4, 3))], "w", "draw")
+    writer.close()
+    assert [game["result"] for game in read_games(str(path))] == ["w", "draw"]
+
+    path.write_bytes(b"JUNK" + data[4:])
+    with pytest.raises(ValueError):
+        list(read_games(str(path)))
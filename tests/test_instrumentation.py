@@ -0,0 +1,45 @@
+import csv
+import json
+from agents.abp import ABPPlayer
+from agents.mcts import MCTSPlayer
+from benchmark import load_position
+from instrumentation import StatsLog, format_stats
+
+
+def test_counters_are_collected_only_when_instrumented():
+    board = load_position("kings")
+    plain, instrumented = ABPPlayer("w", depth=3), ABPPlayer("w", depth=3)
+    instrumented.instrumented = True
+    plain.get_move(board)
+    instrumented.get_move(board)
+    assert set(plain.stats) == {"nodes", "simulations", "depth", "elapsed"}
+    assert instrumented.stats["cutoffs"] > 0 and "tt_hits" in instrumented.stats
+    assert instrumented.stats["nodes"] == plain.stats["nodes"]
+
+    mcts = MCTSPlayer("w", simulations=50)
+    mcts.instrumented = True
+    mcts.get_move(board)
+    assert mcts.stats["root_visits"] == 50 and mcts.stats["tree_nodes"] > 1
+    assert 0 < mcts.stats["mean_rollout_plies"] <= mcts.stats["max_rollout_plies"]
+
+
+def test_stats_log_appends_csv_and_jsonl(tmp_path):
+    row = {"game": 0, "ply": 3, "color": "w", "agent": "ABPPlayer", "elapsed": 0.25, "nodes": 1200, "depth": 4,
+           "extra": 1}
+    for name in ("moves.csv", "moves.jsonl"):
+        path = str(tmp_path / name)
+        for _ in range(2):  # a second run appends below the first
+            log = StatsLog(path)
+            log.write(**row)
+            log.close()
+    with open(tmp_path / "moves.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 2 and rows[1]["nodes"] == "1200" and "extra" not in rows[1]
+    lines = (tmp_path / "moves.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [row, row]
+
+
+def test_overlay_line():
+    assert format_stats({"depth": 5, "nodes": 12345, "elapsed": 0.5}) == "d5 12.3k nodes 0.50s"
+    assert format_stats({"simulations": 500, "cache_hits": 3, "cache_misses": 1, "elapsed": 1.0}) == \
+        "500 sims cache 75% 1.00s"
@@ -0,0 +1,31 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from game_record import read_games
+from main import load_params
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_params_from_config_and_set(tmp_path):
+    config = tmp_path / "match.json"
+    config.write_text(json.dumps({"white_alg": "ABP", "num_games": 4}))
+    args = argparse.Namespace(config=str(config),
+                              set=["num_games=2", "white_move_time=0.5", "record_file=games.acr"])
+    assert load_params(args) == {"white_alg": "ABP", "num_games": 2, "white_move_time": 0.5,
+                                 "record_file": "games.acr"}
+
+
+def test_headless_run_never_loads_a_gui(tmp_path):
+    record = tmp_path / "games.acr"
+    code = ("import sys, runpy; sys.argv = sys.argv[1:]; runpy.run_path('main.py', run_name='__main__'); "
+            "assert not {'pygame', 'dearpygui', 'tkinter'} & set(sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code, "main.py", "--headless", "--set", "white_alg=Random",
+                             "--set", "black_alg=Random", "--set", "num_games=2", "--set", "max_plies=30",
+                             "--set", f"record_file={record}"],
+                            cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert [line.split(":")[0] for line in result.stdout.splitlines()] == ["Game 1", "Game 2"]
+    assert len(list(read_games(str(record)))) == 2
@@ -0,0 +1,70 @@
+import math
+import pytest
+from match import SPRT, VARIANCE_FLOOR, expected_score, elo_from_score, pair_jobs
+
+
+def sprt_with(pairs, elo0=0.0, elo1=20.0):
+    sprt = SPRT(elo0, elo1)
+    for score in pairs:
+        sprt.add_pair(score)
+    return sprt
+
+
+def test_expected_score_and_elo_are_inverse():
+    assert expected_score(0) == 0.5
+    assert expected_score(20) == pytest.approx(0.528751, abs=1e-6)
+    for elo in (-200, -20, 0, 35, 400):
+        assert elo_from_score(expected_score(elo)) == pytest.approx(elo)
+
+
+def test_bounds():
+    sprt = SPRT(alpha=0.05, beta=0.05)
+    assert sprt.lower == pytest.approx(-2.944439, abs=1e-6)
+    assert sprt.upper == pytest.approx(2.944439, abs=1e-6)
+
+
+def test_llr_known_value():
+    # mean 0.6875, variance 0.04296875; LLR = n (s1 - s0) (2 mean - s0 - s1) / (2 variance)
+    sprt = sprt_with([1.0, 0.5, 0.5, 0.75])
+    assert sprt.mean_variance() == (0.6875, 0.04296875)
+    assert sprt.llr() == pytest.approx(0.463354, abs=1e-6)
+
+
+def test_llr_is_zero_halfway_between_hypotheses():
+    halfway = (expected_score(0) + expected_score(20)) / 2
+    assert sprt_with([halfway - 0.25, halfway + 0.25]).llr() == pytest.approx(0.0, abs=1e-12)
+    assert sprt_with([]).llr() == 0.0
+
+
+def test_variance_floor_keeps_mean_unbiased():
+    sprt = sprt_with([0.5] * 10)
+    assert sprt.mean_variance() == (0.5, VARIANCE_FLOOR)
+    s1 = expected_score(20)
+    assert sprt.llr() == pytest.approx(10 * (s1 - 0.5) * (0.5 - s1) / (2 * VARIANCE_FLOOR))
+    assert sprt.elo()[0] == pytest.approx(0.0, abs=1e-9)
+
+
+def test_status_decides_both_ways():
+    draws = SPRT()
+    while draws.status() is None:
+        draws.add_pair(0.5)
+    assert draws.status() == "H0"
+    wins = SPRT()
+    while wins.status() is None:
+        wins.add_pair(1.0)
+    assert wins.status() == "H1"
+    assert len(wins.pairs) < 10
+
+
+def test_elo_interval_contains_estimate():
+    elo, low, high = sprt_with([1.0, 0.5, 0.75, 0.25, 1.0]).elo()
+    assert low < elo < high
+    assert sprt_with([]).elo() == (0.0, -math.inf, math.inf)
+
+
+def test_pair_jobs_swap_colours_with_shared_seed():
+    jobs = list(pair_jobs("A", "B", 3, 7, 100))
+    assert [job[0] for job in jobs] == list(range(6))
+    for first, second in zip(jobs[::2], jobs[1::2]):
+        assert first[3] is True and second[3] is False
+        assert first[4] == second[4] and first[7] == second[7]
@@ -0,0 +1,56 @@
+from agents.mcts import MCTSPlayer
+from benchmark import load_position
+
+
+def test_root_parallel_search_returns_a_legal_move():
+    board = load_position("kings")
+    player = MCTSPlayer("w", simulations=60, workers=2)
+    try:
+        move = player.get_move(board)
+    finally:
+        player.close()
+    assert move in board.get_all_moves("w")
+    assert player.stats["simulations"] == 60
+
+
+def test_tree_is_reused_after_the_opponent_replies():
+    board = load_position("kings")
+    player = MCTSPlayer("w", simulations=300)
+    board.move_piece(*player.get_move(board))
+    kept = player.root
+    reply = max(kept.children, key=lambda child: child.visits)
+    board.move_piece(*reply.move)
+    visits = reply.visits
+    assert visits > 0 and player.reuse_root(board) is reply
+    player.root = kept
+    player.get_move(board)
+    assert player.stats["simulations"] == 300 - visits  # the reused visits count towards the budget
+
+    player.root = kept
+    board.move_piece(*board.get_all_moves("w")[0])  # a position the tree never saw
+    assert player.reuse_root(board) is None
+
+
+def test_nodes_expand_each_generated_move_once():
+    board = load_position("midgame")
+    player = MCTSPlayer("b", simulations=200)
+    calls = []
+
+    def legal_moves(position, color):
+        calls.append(position.hash)
+        return position.get_all_moves(color)
+
+    player.legal_moves = legal_moves
+    player.simulate_random_game = lambda position, color: None  # only expansions generate moves
+    root = player.search(board)
+    assert root.visits == 200
+    stack = [root]
+    expanded = 0
+    while stack:
+        node = stack.pop()
+        if node.moves is not None:
+            expanded += 1
+            assert [child.move for child in node.children] == node.moves[:node.untried]
+            assert node.visits >= sum(child.visits for child in node.children)
+        stack.extend(node.children)
+    assert len(calls) == expanded  # legal moves are generated once per node, not per visit
@@ -0,0 +1,37 @@
+from agents.abp import ABPPlayer
+from benchmark import load_position
+from board import new_board
+from position_cache import PositionCache, shared_position_cache
+
+
+def test_least_recently_used_positions_are_evicted():
+    cache = PositionCache(size=2)
+    boards = [new_board() for _ in range(3)]
+    boards[1].move_piece((5, 0), (4, 0))
+    boards[2].move_piece((5, 7), (4, 7))
+    cache.get_all_moves(boards[0], "b")
+    cache.get_all_moves(boards[1], "b")
+    cache.get_all_moves(boards[0], "b")  # boards[0] is now the most recent
+    cache.get_all_moves(boards[2], "b")
+    assert list(cache.entries) == [(boards[0].hash, "b"), (boards[2].hash, "b")]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_cached_results_match_the_board():
+    cache = PositionCache()
+    board = load_position("captures")
+    for _ in range(2):
+        moves = cache.get_all_moves(board, "w")
+        assert moves == board.get_all_moves("w")
+        moves.reverse()  # callers may reorder their copy
+        assert cache.check_winner(board) is None  # a running game is cached too
+    assert cache.stats()["hits"] == 2 and cache.stats()["entries"] == 2
+
+
+def test_search_with_a_cache_plays_the_same_move():
+    board = load_position("kings")
+    cache = PositionCache()
+    plain, cached = ABPPlayer("w", depth=3), ABPPlayer("w", depth=3, position_cache=cache)
+    assert cached.get_move(board) == plain.get_move(board)
+    assert cache.misses > 0 and cache.hits > 0
+    assert shared_position_cache(10) is shared_position_cache(10) is not shared_position_cache(20)
@@ -0,0 +1,43 @@
+import os
+import time
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+from agents.random import RandomPlayer  # noqa: E402
+from board import DRAW_CACHE, Board  # noqa: E402
+import main  # noqa: E402
+
+
+@pytest.fixture(scope="module", autouse=True)
+def display():
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+def test_board_graphics_are_drawn_once_per_size():
+    board = Board()
+    first, second = pygame.Surface((400, 400)), pygame.Surface((400, 400))
+    board.draw(first)
+    cached = dict(DRAW_CACHE)
+    board.draw(second)
+    assert DRAW_CACHE == cached
+    assert all(DRAW_CACHE[key] is cached[key] for key in cached)
+    assert pygame.image.tobytes(first, "RGB") == pygame.image.tobytes(second, "RGB")
+
+
+def test_games_redraw_only_after_a_change():
+    game = main.GameInstance(0, 0, RandomPlayer("w"), RandomPlayer("b"))
+    try:
+        window = pygame.Surface((main.WIDTH, main.HEIGHT))
+        assert game.draw(window) == game.rect
+        assert game.draw(window) is None
+        game.last_move_time = time.time()  # a move that arrives now waits for MOVE_DELAY
+        game.update()
+        assert game.draw(window) is None
+        game.board.move_piece(*game.board.get_all_moves("w")[0])
+        game.dirty = True
+        assert game.draw(window) == game.rect
+    finally:
+        game.worker.close()
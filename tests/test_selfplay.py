@@ -0,0 +1,68 @@
+import json
+import os
+import pytest
+from board import new_board
+from tablebase import board_masks
+from tournament import player_config
+
+np = pytest.importorskip("numpy")
+import selfplay  # noqa: E402
+
+
+def replay_rows(rows):
+    """Check that every row's masks are the position its game reached, and return the games' moves."""
+    games = {}
+    for row in rows:
+        moves = games.setdefault(int(row["game"]), [])
+        assert int(row["ply"]) == len(moves)
+        board = new_board()
+        for move in moves:
+            board.move_piece(*move)
+        assert tuple(int(row[f]) for f in ("wm", "wk", "bm", "bk")) == board_masks(board)
+        move = selfplay.decode_path(row["path"])
+        assert move in board.get_all_moves("b" if row["turn"] else "w")
+        moves.append(move)
+    return games
+
+
+def test_path_round_trip_keeps_chains_apart():
+    chain = ((3, 3), (3, 5), (5, 5), (5, 3), (3, 3))
+    assert selfplay.decode_path(np.array(selfplay.encode_path(chain), dtype="u1")) == chain
+    longest = tuple((0, col) for col in range(8)) + tuple((1, col) for col in range(8)) + ((2, 0),)
+    assert len(longest) == selfplay.MAX_PATH
+    assert selfplay.decode_path(selfplay.encode_path(longest)) == longest
+
+
+def test_games_replay_from_rows(tmp_path):
+    writer = selfplay.ShardWriter(str(tmp_path), shard_size=16)
+    config = player_config("Random")
+    for game in range(3):
+        writer.write_game(*selfplay.play_selfplay_game((game, config, game, 4, 40)))
+    writer.close()
+    rows = np.concatenate(list(selfplay.load_dataset(str(tmp_path))))
+    assert len(rows) == writer.manifest["positions"]
+    assert len(writer.manifest["shards"]) == -(-len(rows) // 16)
+    assert len(replay_rows(rows)) == 3
+
+
+def test_writer_resumes_partial_shard(tmp_path):
+    config = player_config("Random")
+    writer = selfplay.ShardWriter(str(tmp_path), shard_size=1000)
+    writer.write_game(*selfplay.play_selfplay_game((0, config, 0, 4, 30)))
+    writer.close()
+    first = writer.manifest["positions"]
+
+    resumed = selfplay.ShardWriter(str(tmp_path))
+    assert resumed.filled == first and resumed.shard_size == 1000
+    resumed.write_game(*selfplay.play_selfplay_game((1, config, 1, 4, 30)))
+    resumed.close()
+    rows = np.concatenate(list(selfplay.load_dataset(str(tmp_path))))
+    assert len(rows) == resumed.manifest["positions"] and resumed.manifest["games"] == 2
+    assert sorted(replay_rows(rows)) == [0, 1]
+
+
+def test_writer_refuses_other_formats(tmp_path):
+    with open(os.path.join(tmp_path, selfplay.MANIFEST), "w") as f:
+        json.dump({"shard_size": 8, "shards": [], "games": 0, "positions": 0}, f)
+    with pytest.raises(ValueError):
+        selfplay.ShardWriter(str(tmp_path))
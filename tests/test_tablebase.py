@@ -0,0 +1,161 @@
+import itertools
+import random
+import pytest
+from bitboard import BitBoard
+from tablebase import (Tablebase, generate, signatures, signature_layout, signature_size, position_index,
+                       WIN, LOSS, DRAW)
+
+np = pytest.importorskip("numpy")
+import retrograde  # noqa: E402
+
+PIECES = ("w", "W", "b", "B")
+
+
+def legal_placements(sig):
+    """Every way to put a signature's pieces on the board, as (wm, wk, bm, bk) masks."""
+    wm, wk, bm, bk = sig
+    for white_men in itertools.combinations(range(8, 64), wm):
+        for black_men in itertools.combinations(sorted(set(range(56)) - set(white_men)), bm):
+            free = sorted(set(range(64)) - set(white_men) - set(black_men))
+            for white_kings in itertools.combinations(free, wk):
+                for black_kings in itertools.combinations(sorted(set(free) - set(white_kings)), bk):
+                    yield tuple(sum(1 << sq for sq in group)
+                                for group in (white_men, white_kings, black_men, black_kings))
+
+
+def board_from(masks):
+    board = BitBoard()
+    board.wm = board.wk = board.bm = board.bk = 0
+    board.hash = board.score = 0
+    board._grid = None
+    for piece, mask in zip(PIECES, masks):
+        for sq in range(64):
+            if mask >> sq & 1:
+                board.set_piece(sq, piece)
+    return board
+
+
+def brute_force(max_pieces):
+    """Values of every position, found by playing every move with BitBoard and iterating by distance."""
+    values = {}
+    for sig in signatures(max_pieces):
+        children = {}
+        for masks in legal_placements(sig):
+            board = board_from(masks)
+            for color in ("w", "b"):
+                opponent = "b" if color == "w" else "w"
+                kids = []
+                for move in board.get_all_moves(color):
+                    undo = board.make_move(*move)
+                    child = (board.wm, board.wk, board.bm, board.bk)
+                    alive = child[0] | child[1] if opponent == "w" else child[2] | child[3]
+                    kids.append((child, opponent) if alive else None)
+                    board.unmake_move(undo)
+                children[(masks, color)] = kids
+        level = 0
+        horizon = max([abs(v) for v in values.values()] + [0]) + 1
+        while level <= horizon:
+            found = {}
+            for key, kids in children.items():
+                if key in values:
+                    continue
+                known = [-1 if kid is None else values.get(kid) for kid in kids]
+                if any(v == -level for v in known if v is not None) and level > 0:
+                    found[key] = level + 1
+                elif all(v is not None and v > 0 for v in known) and max(known, default=0) == level:
+                    found[key] = -level - 1
+            values.update(found)
+            if found:
+                horizon = max(horizon, level + 2)
+            level += 1
+    return values
+
+
+def test_layout_counts_every_legal_position_once():
+    for sig in signatures(2) + [(2, 0, 1, 0)]:
+        indices = sorted(position_index(sig, *masks, color)
+                         for masks in legal_placements(sig) for color in ("w", "b"))
+        assert indices == list(range(signature_size(sig)))
+
+
+def test_vectorised_index_matches_position_index():
+    rng = random.Random(1)
+    for sig in signatures(5):
+        blocks, _, _, total = signature_layout(sig)
+        placements = np.array(sorted(rng.sample(range(total), min(300, total))), dtype=np.int64)
+        block_of = np.searchsorted([block[0] for block in blocks], placements, side="right") - 1
+        for block in np.unique(block_of):
+            chosen = placements[block_of == block]
+            squares = retrograde.placements_to_squares(sig, int(block), chosen)
+            assert (retrograde.squares_to_index(sig, squares, 1) == chosen * 2 + 1).all()
+            bounds = np.cumsum((0,) + sig)
+            for row, placement in zip(squares.tolist()[:20], chosen.tolist()):
+                masks = [sum(1 << sq for sq in row[bounds[i]:bounds[i + 1]]) for i in range(4)]
+                assert position_index(sig, *masks, "w") == placement * 2
+
+
+def masks_at(sig, index):
+    blocks = [block[0] for block in signature_layout(sig)[0]]
+    block = int(np.searchsorted(blocks, index >> 1, side="right") - 1)
+    squares = retrograde.placements_to_squares(sig, block, np.array([index >> 1]))[0].tolist()
+    bounds = np.cumsum((0,) + sig)
+    return tuple(sum(1 << sq for sq in squares[bounds[i]:bounds[i + 1]]) for i in range(4))
+
+
+def quiet_children(sig, index):
+    """Indices reached by the moves that stay within the signature, or None when a capture is forced."""
+    board = board_from(masks_at(sig, index))
+    color, opponent = ("b", "w") if index & 1 else ("w", "b")
+    reached = set()
+    for move in board.get_all_moves(color):
+        undo = board.make_move(*move)
+        masks = (board.wm, board.wk, board.bm, board.bk)
+        board.unmake_move(undo)
+        counts = tuple(mask.bit_count() for mask in masks)
+        if sum(counts) < sum(sig):
+            return None  # captures are forced, so every move is one
+        if counts == sig:
+            reached.add(position_index(sig, *masks, opponent))
+    return reached
+
+
+def test_predecessors_invert_quiet_moves():
+    sig = (1, 1, 1, 0)
+    rng = np.random.default_rng(0)
+    for index in rng.choice(signature_size(sig), 60, replace=False).tolist():
+        # Every predecessor moves to `index`, unless it had a capture to make instead.
+        for before in retrograde.predecessors(sig, np.array([index])).tolist():
+            reached = quiet_children(sig, before)
+            assert reached is None or index in reached
+        # And every quiet move is found again from the position it reaches.
+        for child in quiet_children(sig, index) or ():
+            assert index in retrograde.predecessors(sig, np.array([child])).tolist()
+
+
+@pytest.fixture(scope="module")
+def small_tablebase(tmp_path_factory):
+    path = tmp_path_factory.mktemp("tablebase") / "endgame.tb"
+    generate(str(path), 2, verbose=False)
+    return Tablebase(str(path))
+
+
+def test_two_piece_values_match_brute_force(small_tablebase):
+    expected = brute_force(2)
+    checked = 0
+    for sig in signatures(2):
+        for masks in legal_placements(sig):
+            for color in ("w", "b"):
+                value = small_tablebase.values[small_tablebase.offsets[sig] + position_index(sig, *masks, color)]
+                assert value == expected.get((masks, color), 0), (sig, masks, color)
+                checked += 1
+    assert checked == sum(signature_size(sig) for sig in signatures(2))
+
+
+def test_probe_reports_results(small_tablebase):
+    # White king against a black man it can take at once.
+    board = board_from((0, 1 << 36, 1 << 28, 0))
+    assert small_tablebase.probe(board, "w") == (WIN, 1)
+    lone = board_from((0, 1 << 0, 0, 1 << 63))
+    assert small_tablebase.probe(lone, "w") == (DRAW, None)
+    assert small_tablebase.probe(board_from((0, 1, 0, 0)), "b") == (LOSS, 0)
+    assert small_tablebase.probe(BitBoard(), "w") is None
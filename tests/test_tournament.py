@@ -0,0 +1,34 @@
+import json
+from game_record import read_games
+from main import player_settings
+from players import create_player
+from tournament import player_config, run_game, run_tournament
+
+
+def test_tournament_writes_every_game(tmp_path):
+    output, record = tmp_path / "results.jsonl", tmp_path / "games.acr"
+    summary = run_tournament(player_config("Random"), player_config("Random"), 6, str(output), workers=2,
+                             max_plies=60, progress_every=0, record_path=str(record))
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(entry["game"] for entry in lines) == list(range(6))
+    for entry in lines:
+        assert entry["a_color"] == ("w" if entry["game"] % 2 == 0 else "b")
+        assert entry["result"] == {None: "draw", entry["a_color"]: "win"}.get(entry["winner"], "loss")
+    assert summary["wins"] + summary["draws"] + summary["losses"] == 6
+    games = list(read_games(str(record)))
+    assert sorted(len(game["moves"]) for game in games) == sorted(entry["plies"] for entry in lines)
+
+
+def test_games_replay_from_their_seed():
+    job = (0, player_config("Random"), player_config("Random"), True, 42, 80, True, None)
+    first, again = run_game(job), run_game(job)
+    assert first["moves"] == again["moves"] and first["winner"] == again["winner"]
+
+
+def test_menu_settings_reach_create_player():
+    params = {"white_alg": "MCTS", "white_mcts_batch": 64, "black_abp_time": 1.5}
+    white = player_settings(params, "white")
+    black = player_settings(params, "black")
+    assert create_player(color="w", **white).batch_size == 64
+    assert create_player(color="b", **dict(black, alg="ABP")).time_limit == 1.5
+    assert player_settings({"white_abp_time": 0}, "white")["abp_time"] is None
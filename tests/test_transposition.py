@@ -0,0 +1,31 @@
+from agents.transposition import TranspositionTable, ENTRY_BYTES, EXACT, LOWER, encode_move
+
+
+def test_size_stays_within_budget():
+    table = TranspositionTable(megabytes=1)
+    assert table.size * ENTRY_BYTES <= 1024 * 1024 < table.size * 2 * ENTRY_BYTES
+
+
+def test_store_and_probe():
+    table = TranspositionTable(megabytes=1)
+    move = ((5, 0), (3, 0), (3, 2))
+    table.store(12345, 4, EXACT, -70, move)
+    assert table.probe(12345) == (4, EXACT, -70, encode_move(move))
+    assert table.probe(12345 + table.size) is None  # same slot, other position
+    table.store(99, 0, EXACT, 5, None)
+    assert table.probe(99) == (0, EXACT, 5, None)
+
+
+def test_replacement_keeps_deeper_entries_of_the_current_search():
+    table = TranspositionTable(megabytes=1)
+    other = 7 + table.size
+    table.store(7, 6, EXACT, 1, None)
+    table.store(other, 2, LOWER, 2, None)
+    assert table.probe(7) is not None and table.probe(other) is None
+    table.store(7, 1, LOWER, 3, None)  # the same position is always overwritten
+    assert table.probe(7) == (1, LOWER, 3, None)
+
+    table.store(7, 6, EXACT, 1, None)
+    table.new_search()
+    table.store(other, 2, LOWER, 2, None)  # entries of an earlier search give way
+    assert table.probe(7) is None and table.probe(other) == (2, LOWER, 2, None)
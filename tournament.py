@@ -0,0 +1,193 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+from board import new_board
+from game_record import GameRecordWriter
+from players import create_player
+from position_cache import shared_position_cache
+
+DEFAULT_MAX_PLIES = 200
+
+
+def player_config(alg, abp_depth=3, mcts_sims=500, abp_time=None, mcts_batch=1, move_time=None, position_cache=0):
+    """`position_cache` > 0 gives the player the pool process's PositionCache of that many positions."""
+    return {"alg": alg, "abp_depth": abp_depth, "mcts_sims": mcts_sims, "abp_time": abp_time,
+            "mcts_batch": mcts_batch, "move_time": move_time, "position_cache": position_cache}
+
+
+def build_player(config, color):
+    cache_size = config.get("position_cache", 0)
+    return create_player(config["alg"], color, config["abp_depth"], config["mcts_sims"], config["abp_time"],
+                         mcts_batch=config.get("mcts_batch", 1),
+                         position_cache=shared_position_cache(cache_size) if cache_size else None)
+
+
+def play_game(white_player, black_player, first_turn=None, max_plies=DEFAULT_MAX_PLIES, budgets=None,
+              moves=None, on_move=None):
+    """Play one game without any GUI, following GameInstance.update's rules.
+
+    `budgets` optionally maps a colour to the seconds it may think per move.
+    Returns (winner, plies, move_times) where winner is "w", "b" or None for a
+    draw at max_plies, and move_times maps each colour to its get_move durations.
+    Every move played is appended to `moves` when a list is given, and passed to
+    `on_move` as soon as it is played.
+    """
+    board = new_board()
+    turn = first_turn or random.choice(["w", "b"])
+    move_times = {"w": [], "b": []}
+    budgets = budgets or {}
+    for ply in range(max_plies):
+        player = white_player if turn == "w" else black_player
+        start = time.perf_counter()
+        budget = budgets.get(turn)
+        move = player.get_move(board, time.monotonic() + budget if budget else None)
+        move_times[turn].append(time.perf_counter() - start)
+        if not move:
+            return ("b" if turn == "w" else "w"), ply, move_times
+        board.move_piece(*move)
+        if moves is not None:
+            moves.append(move)
+        if on_move is not None:
+            on_move(move)
+        turn = "b" if turn == "w" else "w"
+    return None, max_plies, move_times
+
+
+def run_game(job):
+    index, config_a, config_b, a_is_white, seed, max_plies, keep_moves, first_turn = job
+    random.seed(seed)
+    first_turn = first_turn or random.choice(["w", "b"])
+    moves = [] if keep_moves else None
+    white_config, black_config = (config_a, config_b) if a_is_white else (config_b, config_a)
+    start = time.perf_counter()
+    budgets = {"w": white_config.get("move_time"), "b": black_config.get("move_time")}
+    winner, plies, move_times = play_game(build_player(white_config, "w"), build_player(black_config, "b"),
+                                          first_turn, max_plies, budgets, moves)
+    a_color = "w" if a_is_white else "b"
+    if winner is None:
+        result = "draw"
+    else:
+        result = "win" if winner == a_color else "loss"
+    b_color = "b" if a_is_white else "w"
+    entry = {
+        "game": index,
+        "seed": seed,
+        "a_color": a_color,
+        "winner": winner,
+        "result": result,
+        "plies": plies,
+        "seconds": time.perf_counter() - start,
+        "a_move_seconds": sum(move_times[a_color]),
+        "a_moves": len(move_times[a_color]),
+        "a_max_move_seconds": max(move_times[a_color], default=0.0),
+        "b_move_seconds": sum(move_times[b_color]),
+        "b_moves": len(move_times[b_color]),
+        "b_max_move_seconds": max(move_times[b_color], default=0.0),
+    }
+    if keep_moves:
+        entry["first_turn"] = first_turn
+        entry["moves"] = moves
+    return entry
+
+
+def run_tournament(config_a, config_b, games, output, workers=None, seed=0,
+                   max_plies=DEFAULT_MAX_PLIES, swap_colors=True, progress_every=100, record_path=None):
+    """Play `games` games of config A against config B across a process pool.
+
+    Every finished game is appended to `output` as one JSON line straight away,
+    so an interrupted run keeps everything played so far; with `record_path` the
+    moves of every game also go to that binary game record. Returns the summary.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = [(i, config_a, config_b, i % 2 == 0 or not swap_colors, seed + i, max_plies,
+             record_path is not None, None)
+            for i in range(games)]
+    counts = {"win": 0, "draw": 0, "loss": 0}
+    totals = {"a_move_seconds": 0.0, "a_moves": 0, "b_move_seconds": 0.0, "b_moves": 0,
+              "a_max_move_seconds": 0.0, "b_max_move_seconds": 0.0, "plies": 0}
+    start = time.perf_counter()
+    recorder = GameRecordWriter(record_path) if record_path else None
+    meta = {"a": config_a, "b": config_b}
+
+    with open(output, "a") as out, multiprocessing.Pool(workers) as pool:
+        for done, record in enumerate(pool.imap_unordered(run_game, jobs), 1):
+            if recorder is not None:
+                winner = record["winner"] or "draw"
+                recorder.write_game(record.pop("moves"), record.pop("first_turn"), winner, record["seconds"],
+                                    dict(meta, game=record["game"], seed=record["seed"],
+                                         a_color=record["a_color"]))
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            counts[record["result"]] += 1
+            for key in ("a_move_seconds", "a_moves", "b_move_seconds", "b_moves", "plies"):
+                totals[key] += record[key]
+            for key in ("a_max_move_seconds", "b_max_move_seconds"):
+                totals[key] = max(totals[key], record[key])
+            if progress_every and done % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{done}/{games} games, {done / elapsed:.2f} games/s, "
+                      f"W/D/L {counts['win']}/{counts['draw']}/{counts['loss']}")
+    if recorder is not None:
+        recorder.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "games": games,
+        "workers": workers,
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+        "wins": counts["win"],
+        "draws": counts["draw"],
+        "losses": counts["loss"],
+        "mean_plies": totals["plies"] / games if games else 0.0,
+        "a_mean_move_ms": 1000 * totals["a_move_seconds"] / max(1, totals["a_moves"]),
+        "a_max_move_ms": 1000 * totals["a_max_move_seconds"],
+        "b_mean_move_ms": 1000 * totals["b_move_seconds"] / max(1, totals["b_moves"]),
+        "b_max_move_ms": 1000 * totals["b_max_move_seconds"],
+    }
+
+
+def add_player_arguments(parser, name):
+    parser.add_argument(f"--{name}-alg", choices=["ABP", "MCTS", "Random"], required=True)
+    parser.add_argument(f"--{name}-depth", type=int, default=3, help="ABP search depth")
+    parser.add_argument(f"--{name}-time", type=float, default=None, help="ABP seconds per move")
+    parser.add_argument(f"--{name}-sims", type=int, default=500, help="MCTS simulations")
+    parser.add_argument(f"--{name}-batch", type=int, default=1, help="MCTS leaves per NumPy rollout batch")
+    parser.add_argument(f"--{name}-move-time", type=float, default=None,
+                        help="seconds per move for any algorithm, replacing its depth or simulation budget")
+    parser.add_argument(f"--{name}-position-cache", type=int, default=0,
+                        help="positions in a move cache shared by every player of a worker process, 0 = off")
+
+
+def config_from_args(args, name):
+    return player_config(getattr(args, f"{name}_alg"), getattr(args, f"{name}_depth"),
+                         getattr(args, f"{name}_sims"), getattr(args, f"{name}_time"),
+                         getattr(args, f"{name}_batch"), getattr(args, f"{name}_move_time"),
+                         getattr(args, f"{name}_position_cache"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless games between two agent configurations.")
+    add_player_arguments(parser, "a")
+    add_player_arguments(parser, "b")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to all cores")
+    parser.add_argument("--output", default="tournament.jsonl")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES)
+    parser.add_argument("--no-swap", action="store_true", help="config A always plays White")
+    parser.add_argument("--record", help="also append every game's moves to this binary game record")
+    args = parser.parse_args()
+
+    summary = run_tournament(config_from_args(args, "a"), config_from_args(args, "b"), args.games,
+                             args.output, workers=args.workers, seed=args.seed,
+                             max_plies=args.max_plies, swap_colors=not args.no_swap,
+                             record_path=args.record)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()